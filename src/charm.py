@@ -5,12 +5,15 @@
 
 """A charm for integrating Azure service principal credentials to a charmed application."""
 
+import json
 import logging
 
 import ops
 
+from constants import HOOK_TOOL_METRICS_FILE
 from core.context import Context
 from events.lifecycle import LifecycleEvents
+from utils.instrumentation import HookToolRecorder, current_hook
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +24,12 @@ class AzureAuthIntegratorCharm(ops.charm.CharmBase):
     def __init__(self, *args) -> None:
         super().__init__(*args)
 
+        # Instrumentation
+        self.hook_tool_recorder: HookToolRecorder | None = None
+        if self.config.get("instrument-hook-tools"):
+            self.hook_tool_recorder = HookToolRecorder(self.model._backend)
+            self.framework.observe(self.framework.on.commit, self._on_commit)
+
         # Context
         self.context = Context(model=self.model, config=self.config)
 
@@ -54,6 +63,19 @@ class AzureAuthIntegratorCharm(ops.charm.CharmBase):
 
         event.add_status(ops.model.ActiveStatus())
 
+    def _on_commit(self, _event: ops.CommitEvent) -> None:
+        """Report the hook-tool calls made during this dispatch."""
+        if not self.hook_tool_recorder:
+            return
+
+        hook = current_hook()
+        summary = self.hook_tool_recorder.summary(hook)
+        logger.debug(f"Hook-tool calls: {json.dumps(summary)}")
+        try:
+            self.hook_tool_recorder.dump(self.charm_dir / HOOK_TOOL_METRICS_FILE, hook)
+        except OSError as e:
+            logger.warning(f"Could not write hook-tool metrics: {e}")
+
     def _collect_domain_statuses(self) -> list[ops.StatusBase]:
         """Return a list of each component status of the charm."""
         statuses: list[ops.StatusBase] = []
@@ -10,3 +10,20 @@ AZURE_SERVICE_PRINCIPAL_MANDATORY_OPTIONS = [
     "tenant-id",
     "credentials",
 ]
+
+# Validation of the credentials against the Entra ID token endpoint.
+CREDENTIALS_VALIDATION_SCOPE = "https://management.azure.com/.default"
+CREDENTIALS_VALIDATION_TIMEOUT = 10
+CREDENTIALS_VALIDATION_TTL = 60 * 60
+# How soon to try again when the token endpoint could not be reached.
+CREDENTIALS_VALIDATION_RETRY = 5 * 60
+
+# Access tokens minted for the consumers are renewed that long before they expire, plus
+# up to the jitter, so that tokens minted together are not all renewed on the same hook.
+ACCESS_TOKEN_EXPIRY_SKEW = 5 * 60
+ACCESS_TOKEN_REFRESH_JITTER = 10 * 60
+# At most that many access tokens are renewed per hook, the others on the next ones.
+ACCESS_TOKEN_REFRESH_BATCH = 5
+ACCESS_TOKEN_SECRET_PREFIX = "access-token."
+
+HOOK_TOOL_METRICS_FILE = "hook-tool-metrics.json"
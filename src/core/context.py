@@ -3,33 +3,115 @@
 
 """Charm context definition and parsing logic."""
 
+from functools import cached_property
+
 from ops import ConfigData, Model
 
+from constants import AZURE_SERVICE_PRINCIPAL_MANDATORY_OPTIONS
 from core.domain import AzureServicePrincipalInfo
 from utils.logging import WithLogging
 from utils.secrets import decode_secret_key
 
 
+def default_service_principal_options(config: ConfigData) -> dict[str, str]:
+    """Return the options of the default service principal."""
+    return {
+        option: config.get(option) or "" for option in AZURE_SERVICE_PRINCIPAL_MANDATORY_OPTIONS
+    }
+
+
+def parse_service_principals(config: ConfigData) -> dict[str, dict[str, str]]:
+    """Return the options of every service principal configured, by name.
+
+    The default service principal, unnamed, is set by the `subscription-id`, `tenant-id` and
+    `credentials` options. The `service-principals` option maps the names of the others to
+    the URI of their credentials secret, or to their own options, the missing ones being
+    taken from the default.
+
+    Raises:
+        ValueError: When `service-principals` is not a valid mapping.
+    """
+    default = default_service_principal_options(config)
+    if not (raw := config.get("service-principals")):
+        return {"": default}
+
+    # Only imported when used, a YAML mapping also accepts JSON.
+    import yaml
+
+    try:
+        loaded = yaml.safe_load(str(raw))
+    except yaml.YAMLError as e:
+        raise ValueError(f"not valid YAML or JSON: {e}")
+    if not isinstance(loaded, dict):
+        raise ValueError("expected a mapping of names to credentials secret URIs")
+
+    # The default is only served alongside the named ones once its credentials are set.
+    principals = {"": default} if default["credentials"] else {}
+    for name, options in loaded.items():
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"invalid service principal name {name!r}")
+        if isinstance(options, str):
+            options = {"credentials": options}
+        if not isinstance(options, dict):
+            raise ValueError(f"invalid options for service principal {name}")
+        if unknown := sorted(set(options) - set(AZURE_SERVICE_PRINCIPAL_MANDATORY_OPTIONS)):
+            raise ValueError(f"unknown options for service principal {name}: {unknown}")
+        principals[name] = {
+            option: str(options.get(option) or default[option])
+            for option in AZURE_SERVICE_PRINCIPAL_MANDATORY_OPTIONS
+        }
+    return principals
+
+
 class Context(WithLogging):
     """Properties and relations of the charm."""
 
     def __init__(self, model: Model, config: ConfigData):
         self.model = model
         self.charm_config = config
+        # The service principals resolved in this dispatch, by name.
+        self._service_principals: dict[str, AzureServicePrincipalInfo | None] = {}
 
     @property
     def azure_service_principal(self) -> AzureServicePrincipalInfo:
         """Return information related to the Azure service principal parameters."""
-        credentials = self.charm_config.get("credentials")
+        return self.get_service_principal("") or AzureServicePrincipalInfo()
+
+    @cached_property
+    def service_principal_options(self) -> dict[str, dict[str, str]]:
+        """Return the options of every service principal configured, by name."""
+        try:
+            return parse_service_principals(self.charm_config)
+        except ValueError as e:
+            self.logger.warning(f"Invalid service-principals: {e}")
+            return {"": default_service_principal_options(self.charm_config)}
+
+    def get_service_principal(self, name: str = "") -> AzureServicePrincipalInfo | None:
+        """Return the service principal of that name, if configured.
+
+        Each service principal is resolved once per dispatch, and the credentials secrets
+        are read through the secret content cache, so service principals sharing
+        credentials only read them once.
+        """
+        if name not in self._service_principals:
+            self._service_principals[name] = self._resolve_service_principal(name)
+        return self._service_principals[name]
+
+    def _resolve_service_principal(self, name: str) -> AzureServicePrincipalInfo | None:
+        """Build the service principal of that name from its options and credentials."""
+        if (options := self.service_principal_options.get(name)) is None:
+            return None
+
         try:
-            secret_dict = decode_secret_key(self.model, credentials)
+            secret_dict = decode_secret_key(self.model, options["credentials"])
         except Exception as e:
             self.logger.warning(str(e))
             secret_dict = {}
 
         return AzureServicePrincipalInfo(
-            subscription_id=self.charm_config.get("subscription-id"),
-            tenant_id=self.charm_config.get("tenant-id"),
+            subscription_id=options["subscription-id"],
+            tenant_id=options["tenant-id"],
             client_id=secret_dict.get("client-id", ""),
             client_secret=secret_dict.get("client-secret", ""),
+            name=name,
         )
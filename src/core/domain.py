@@ -3,30 +3,51 @@
 
 """Definition of model classes."""
 
-from dataclasses import dataclass
+import hashlib
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AzureServicePrincipalInfo:
-    """Azure service principal parameters."""
+    """Azure service principal parameters.
 
-    subscription_id: str = ""
-    tenant_id: str = ""
-    client_id: str = ""
-    client_secret: str = ""
+    `name` identifies the service principal among those served, the default one is unnamed.
+
+    Instances are immutable. Their relation data, canonical serialization and digest are
+    computed once, on creation, and two instances are equal when their digests are.
+    """
+
+    subscription_id: str = field(default="", compare=False)
+    tenant_id: str = field(default="", compare=False)
+    client_id: str = field(default="", compare=False)
+    client_secret: str = field(default="", compare=False, repr=False)
+    name: str = field(default="", compare=False)
+
+    data: Mapping[str, str] = field(init=False, repr=False, compare=False)
+    serialized: str = field(init=False, repr=False, compare=False)
+    digest: str = field(init=False, repr=False)
 
     def __post_init__(self):
-        """Clean up data immediately after initialization."""
-        self.subscription_id = self.subscription_id or ""
-        self.tenant_id = self.tenant_id or ""
-        self.client_id = self.client_id or ""
-        self.client_secret = self.client_secret or ""
+        """Clean up data immediately after initialization, and serialize it."""
+        for attribute in ("subscription_id", "tenant_id", "client_id", "client_secret", "name"):
+            object.__setattr__(self, attribute, getattr(self, attribute) or "")
+
+        data = MappingProxyType(
+            {
+                "subscription-id": self.subscription_id,
+                "tenant-id": self.tenant_id,
+                "client-id": self.client_id,
+                "client-secret": self.client_secret,
+            }
+        )
+        serialized = json.dumps({"name": self.name, **data}, sort_keys=True)
+        object.__setattr__(self, "data", data)
+        object.__setattr__(self, "serialized", serialized)
+        object.__setattr__(self, "digest", hashlib.sha256(serialized.encode()).hexdigest())
 
     def to_dict(self) -> dict:
         """Return data as dictionary, ensuring all values are string."""
-        return {
-            "subscription-id": self.subscription_id,
-            "tenant-id": self.tenant_id,
-            "client-id": self.client_id,
-            "client-secret": self.client_secret,
-        }
+        return dict(self.data)
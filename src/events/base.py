@@ -3,43 +3,141 @@
 
 """Base utilities exposing common functionalities for all Events classes."""
 
-from ops import Model, Object, StatusBase
-from ops.model import ActiveStatus, BlockedStatus, ModelError
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
-
-from constants import AZURE_SERVICE_PRINCIPAL_MANDATORY_OPTIONS
-from utils.logging import WithLogging
-from utils.secrets import decode_secret_key
+import time
 
+from ops import Object, StatusBase, StoredState
+from ops.model import ActiveStatus, BlockedStatus, ModelError, SecretNotFoundError, WaitingStatus
 
-# Retry due to: https://github.com/canonical/object-storage-integrator/issues/34
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_fixed(5),
-    retry=retry_if_exception_type(ModelError),
-    reraise=True,
+from constants import (
+    CREDENTIALS_VALIDATION_RETRY,
+    CREDENTIALS_VALIDATION_SCOPE,
+    CREDENTIALS_VALIDATION_TIMEOUT,
+    CREDENTIALS_VALIDATION_TTL,
 )
-def decode_secret_key_with_retry(model: Model, secret_id: str):
-    """Try to decode the secret key, retry for 3 times before failing."""
-    return decode_secret_key(model, secret_id)
+from core.context import parse_service_principals
+from utils.logging import WithLogging
+from utils.oauth import ValidationResult, credentials_digest, validate_credentials
+from utils.secrets import decode_secret_key
 
 
 class BaseEventHandler(Object, WithLogging):
     """Base class for all Event Handler classes."""
 
+    _state = StoredState()
+
     def get_app_status(self, model, charm_config) -> StatusBase:
-        """Return the status of the charm."""
-        missing_options = []
-        for config_option in AZURE_SERVICE_PRINCIPAL_MANDATORY_OPTIONS:
-            if not charm_config.get(config_option):
-                missing_options.append(config_option)
+        """Return the status of the charm, the first problem found on a service principal."""
+        self._state.set_default(secret_access_pending=False)
+
+        try:
+            principals = parse_service_principals(charm_config)
+        except ValueError as e:
+            self.logger.warning(f"Invalid service-principals: {e}")
+            return BlockedStatus(f"Invalid service-principals: {e}")
+
+        for name, options in principals.items():
+            status = self._service_principal_status(model, charm_config, name, options)
+            if isinstance(status, ActiveStatus):
+                continue
+            return type(status)(f"{name}: {status.message}") if name else status
+
+        return ActiveStatus()
+
+    def _service_principal_status(
+        self, model, charm_config, name: str, options: dict[str, str]
+    ) -> StatusBase:
+        """Return the status of a single service principal."""
+        missing_options = [option for option, value in options.items() if not value]
         if missing_options:
             self.logger.warning(f"Missing parameters: {missing_options}")
             return BlockedStatus(f"Missing parameters: {missing_options}")
         try:
-            decode_secret_key_with_retry(model, charm_config.get("credentials"))
+            credentials = decode_secret_key(model, options["credentials"])
+        except SecretNotFoundError as e:
+            self.logger.warning(f"Error in decoding secret: {e}")
+            return BlockedStatus(str(e))
+        except ModelError as e:
+            # Access may be granted at any time, re-checked on a later hook instead of sleeping.
+            # See: https://github.com/canonical/object-storage-integrator/issues/34
+            if "has not been granted" not in str(e):
+                self.logger.warning(f"Error in decoding secret: {e}")
+                return BlockedStatus(str(e))
+            self.logger.info(f"{e} Retrying on a later hook.")
+            self._state.secret_access_pending = True
+            return WaitingStatus(str(e))
         except Exception as e:
             self.logger.warning(f"Error in decoding secret: {e}")
             return BlockedStatus(str(e))
 
+        if status := self._credentials_validation_status(charm_config, options, credentials):
+            return status
+
         return ActiveStatus()
+
+    def _credentials_validation_status(
+        self, charm_config, options: dict[str, str], credentials
+    ) -> StatusBase | None:
+        """Return the status of the credentials validation, if enabled and not successful.
+
+        Only the leader validates the credentials, the other units would each query the token
+        endpoint for the same outcome.
+        """
+        if not charm_config.get("validate-credentials") or not credentials:
+            return None
+        if not self.model.unit.is_leader():
+            return None
+
+        result = self.get_credentials_validation(
+            charm_config.get("authority-url") or "", options["tenant-id"], credentials
+        )
+        if result.valid is False:
+            return BlockedStatus(result.message)
+        if result.valid is None:
+            return WaitingStatus(result.message)
+        return None
+
+    def get_credentials_validation(
+        self, authority_url: str, tenant_id: str, credentials: dict
+    ) -> ValidationResult:
+        """Return the outcome of validating the credentials against the token endpoint.
+
+        The outcome is kept in the stored state, keyed by a digest of the credentials, so
+        that the token endpoint is only queried again once it expires or they change. Each
+        service principal has its own.
+        """
+        self._state.set_default(credentials_validation={})
+        digest = credentials_digest(
+            authority_url, tenant_id, credentials["client-id"], credentials["client-secret"]
+        )
+
+        validations = self._state.credentials_validation
+        cached = validations.get(digest)
+        if cached and cached["expires"] > time.time():
+            return ValidationResult(**cached)
+
+        result = validate_credentials(
+            authority_url,
+            tenant_id,
+            credentials["client-id"],
+            credentials["client-secret"],
+            scope=CREDENTIALS_VALIDATION_SCOPE,
+            timeout=CREDENTIALS_VALIDATION_TIMEOUT,
+            ttl=CREDENTIALS_VALIDATION_TTL,
+            retry=CREDENTIALS_VALIDATION_RETRY,
+        )
+        # One outcome per set of credentials, the expired ones are dropped.
+        now = time.time()
+        self._state.credentials_validation = {
+            key: dict(value) for key, value in validations.items() if value["expires"] > now
+        } | {digest: result.to_dict()}
+        return result
+
+    @property
+    def secret_access_pending(self) -> bool:
+        """Whether a previous hook failed to read the credentials for lack of permission."""
+        self._state.set_default(secret_access_pending=False)
+        return bool(self._state.secret_access_pending)
+
+    def clear_secret_access_pending(self) -> None:
+        """Forget a previously recorded secret access failure."""
+        self._state.secret_access_pending = False
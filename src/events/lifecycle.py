@@ -3,20 +3,47 @@
 
 """Azure Service Principal provider related event handlers."""
 
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
 import ops
-from charms.azure_auth_integrator.v0.azure_service_principal import (
-    AzureServicePrincipalProvider,
-    ServicePrincipalInfoRequestedEvent,
-)
 from ops import CharmBase
 from ops.charm import (
     ConfigChangedEvent,
 )
 
-from constants import AZURE_SERVICE_PRINCIPAL_RELATION_NAME
+from constants import (
+    ACCESS_TOKEN_EXPIRY_SKEW,
+    ACCESS_TOKEN_REFRESH_BATCH,
+    ACCESS_TOKEN_REFRESH_JITTER,
+    ACCESS_TOKEN_SECRET_PREFIX,
+    AZURE_SERVICE_PRINCIPAL_RELATION_NAME,
+    CREDENTIALS_VALIDATION_RETRY,
+    CREDENTIALS_VALIDATION_TIMEOUT,
+)
 from core.context import Context
+from core.domain import AzureServicePrincipalInfo
 from events.base import BaseEventHandler
+from utils.instrumentation import current_hook
 from utils.logging import WithLogging
+from utils.oauth import (
+    CredentialsRejectedError,
+    ValidationUnavailableError,
+    credentials_digest,
+    mint_access_token,
+)
+from utils.secrets import decode_secret_key
+
+if TYPE_CHECKING:
+    # The provider library pulls in pydantic and data_interfaces, imported only when used.
+    from charms.azure_auth_integrator.v0.azure_service_principal import (
+        AccessTokensRequestedEvent,
+        AzureServicePrincipalProvider,
+        ServicePrincipalInfoRequestedEvent,
+    )
 
 
 class LifecycleEvents(BaseEventHandler, WithLogging):
@@ -28,22 +55,82 @@ class LifecycleEvents(BaseEventHandler, WithLogging):
         self.charm = charm
         self.context = context
 
-        self.azure_service_principal_provider = AzureServicePrincipalProvider(
-            self.charm, AZURE_SERVICE_PRINCIPAL_RELATION_NAME
-        )
+        self._azure_service_principal_provider: "AzureServicePrincipalProvider | None" = None
+        if self._dispatch_needs_provider():
+            # The provider library handles these hooks itself, so it must observe them.
+            self.azure_service_principal_provider
 
+        self.framework.observe(self.charm.on.leader_elected, self._on_leader_elected)
         self.framework.observe(self.charm.on.update_status, self._on_update_status)
         self.framework.observe(self.charm.on.config_changed, self._on_config_changed)
         self.framework.observe(self.charm.on.secret_changed, self._on_secret_changed)
-
+        self.framework.observe(self.charm.on.secret_expired, self._on_secret_expired)
+        self.framework.observe(self.charm.on.secret_remove, self._on_secret_remove)
         self.framework.observe(
-            self.azure_service_principal_provider.on.service_principal_info_requested,
-            self._on_azure_service_principal_info_requested,
+            self.charm.on[AZURE_SERVICE_PRINCIPAL_RELATION_NAME].relation_broken,
+            self._on_relation_broken,
+        )
+
+    @property
+    def azure_service_principal_provider(self) -> "AzureServicePrincipalProvider":
+        """The provider side of the relation, set up the first time it is needed."""
+        if self._azure_service_principal_provider is None:
+            from charms.azure_auth_integrator.v0.azure_service_principal import (
+                AzureServicePrincipalProvider,
+            )
+
+            self._azure_service_principal_provider = AzureServicePrincipalProvider(
+                self.charm,
+                AZURE_SERVICE_PRINCIPAL_RELATION_NAME,
+                # The credentials are published in one secret granted to every consumer.
+                shared_secret=True,
+            )
+            self.framework.observe(
+                self._azure_service_principal_provider.on.service_principal_info_requested,
+                self._on_azure_service_principal_info_requested,
+            )
+            self.framework.observe(
+                self._azure_service_principal_provider.on.access_tokens_requested,
+                self._on_access_tokens_requested,
+            )
+        return self._azure_service_principal_provider
+
+    @staticmethod
+    def _dispatch_needs_provider() -> bool:
+        """Whether the hook being dispatched is one the provider library reacts to."""
+        hook = current_hook()
+        return hook.startswith(f"{AZURE_SERVICE_PRINCIPAL_RELATION_NAME}-relation-") or (
+            hook in ("secret-remove", "leader-elected")
         )
 
+    def _on_leader_elected(self, _event: ops.LeaderElectedEvent):
+        """Republish the provider data, another leader may have published since this unit.
+
+        What was published to each relation, and the service principal each relation
+        selects, are only known to the leader that last handled them.
+        """
+        provider = self.azure_service_principal_provider
+        self._state.published_relations = {}
+        self._state.relation_principals = {
+            str(relation.id): provider.requested_service_principal(relation)
+            for relation in self.model.relations[AZURE_SERVICE_PRINCIPAL_RELATION_NAME]
+        }
+        self._update_provider_data()
+
     def _on_update_status(self, _event: ops.UpdateStatusEvent):
-        """Handle the update status event."""
+        """Handle the update status event.
+
+        Non-leader units cannot write the application databag, so they only re-check access to
+        the credentials secret; the unit status itself is computed on collect-status. The leader
+        reconciles the provider data, which is a no-op when nothing has changed.
+        """
+        self._secret_access_restored()
+
+        if not self.charm.unit.is_leader():
+            return
+
         self._update_provider_data()
+        self._refresh_access_tokens()
 
     def _on_config_changed(self, _event: ConfigChangedEvent) -> None:  # noqa: C901
         """Event handler for configuration changed events."""
@@ -53,41 +140,373 @@ class LifecycleEvents(BaseEventHandler, WithLogging):
 
         self.logger.debug(f"Config changed... Current configuration: {self.charm.config}")
         self._update_provider_data()
+        self._update_access_tokens()
 
     def _on_secret_changed(self, event: ops.SecretChangedEvent):
         """Handle the secret changed event.
 
         When a secret is changed, it is first checked that whether this particular secret
-        is used in the charm's config. If yes, the secret is to be updated in the relation
-        databag.
+        holds the credentials of one of the service principals served. If yes, the secret is
+        to be updated in the relation databag.
         """
+        restored = self._secret_access_restored()
+
         # Only execute in the unit leader
         if not self.charm.unit.is_leader():
             return
 
-        if not self.charm.config.get("credentials"):
-            return
-
-        secret = event.secret
-        if self.charm.config.get("credentials") != secret.id:
+        if not restored and event.secret.id not in self._credentials_uris():
             return
 
         self._update_provider_data()
+        self._update_access_tokens()
+
+    def _on_secret_expired(self, event: ops.SecretExpiredEvent):
+        """Handle the secret expired event."""
+        if self._secret_access_restored() and self.charm.unit.is_leader():
+            self._update_provider_data()
+
+        if (event.secret.label or "").startswith(ACCESS_TOKEN_SECRET_PREFIX):
+            self._refresh_access_tokens()
+
+    def _on_secret_remove(self, event: ops.SecretRemoveEvent):
+        """Remove the access token revisions that no consumer tracks anymore."""
+        if (event.secret.label or "").startswith(ACCESS_TOKEN_SECRET_PREFIX):
+            event.remove_revision()
+
+    def _credentials_uris(self) -> set[str]:
+        """Return the URI of the credentials secret of every service principal served."""
+        return {
+            options["credentials"]
+            for options in self.context.service_principal_options.values()
+            if options.get("credentials")
+        }
+
+    def _secret_access_restored(self) -> bool:
+        """Re-check the credentials secrets that a previous hook was not allowed to read.
+
+        Returns:
+            True if access was pending and every credentials secret can now be decoded.
+        """
+        if not self.secret_access_pending:
+            return False
+
+        for uri in sorted(self._credentials_uris()):
+            try:
+                decode_secret_key(self.charm.model, uri)
+            except Exception as e:
+                self.logger.debug(f"Credentials secret {uri} still not readable: {e}")
+                return False
+
+        self.logger.info("Access to the credentials secrets has been granted.")
+        self.clear_secret_access_pending()
+        return True
 
     def _update_provider_data(self):
-        """Update the contents of the relation data bag."""
+        """Update the contents of the relation data bags that are not up to date.
+
+        The fingerprint last published to each relation is kept in the stored state, so
+        only new relations, and all of them when the data changes, are written to.
+        """
         self.logger.debug("Updating the provider data.")
-        data = self.context.azure_service_principal.to_dict()
         relations = self.model.relations[AZURE_SERVICE_PRINCIPAL_RELATION_NAME]
+
+        self._state.set_default(published_relations={}, relation_principals={})
+        published = self._state.published_relations
+        selections = self._state.relation_principals
+        current = {str(relation.id) for relation in relations}
+        for relation_id in set(published) - current:
+            del published[relation_id]
+        for relation_id in set(selections) - current:
+            del selections[relation_id]
+
+        # Relations are served the service principal they selected, the default otherwise.
+        groups: dict[str, list[ops.Relation]] = {}
+        for relation in relations:
+            groups.setdefault(self._relation_principal(relation), []).append(relation)
+
+        updated = False
+        for name, group in groups.items():
+            if (info := self.context.get_service_principal(name)) is None:
+                relation_ids = [relation.id for relation in group]
+                self.logger.warning(f"Unknown service principal {name!r} on {relation_ids}.")
+                continue
+
+            fingerprint = self._provider_fingerprint(info)
+            stale = [
+                relation for relation in group if published.get(str(relation.id)) != fingerprint
+            ]
+            if not stale:
+                continue
+
+            self.azure_service_principal_provider.update_responses(
+                info.data, stale, principal=name
+            )
+            for relation in stale:
+                published[str(relation.id)] = fingerprint
+            updated = True
+
+        if not updated:
+            self.logger.debug("Provider data already published, nothing to update.")
+
+    def _relation_principal(self, relation: ops.Relation) -> str:
+        """Return the name of the service principal a relation selects, empty for the default.
+
+        Selections are kept in the stored state, and read again when the requirer changes
+        its databag. A relation selecting a name that is not configured is left unpublished,
+        even when only the default service principal is, but the relations whose selection
+        is not known yet are only read when several service principals are configured.
+        """
+        self._state.set_default(relation_principals={})
+        selections = self._state.relation_principals
+        if (name := selections.get(str(relation.id))) is None:
+            if not self.charm.config.get("service-principals"):
+                return ""
+            provider = self.azure_service_principal_provider
+            name = selections[str(relation.id)] = provider.requested_service_principal(relation)
+        return name
+
+    @staticmethod
+    def _provider_fingerprint(info: AzureServicePrincipalInfo) -> str:
+        """Return a SHA-256 digest of the provider data."""
+        return info.digest
+
+    def _update_access_tokens(self) -> None:
+        """Mint the access tokens the consumers ask for, and share them on their relation.
+
+        Tokens are shared by all the consumers asking for the same scope. Only the tokens not
+        minted yet are requested here: renewals, those due to new credentials included, are
+        left to the batches of `_refresh_access_tokens`. Tokens no longer asked for, and all
+        of them when minting is disabled, are removed.
+        """
+        if not self.charm.unit.is_leader():
+            return
+
+        self._state.set_default(access_tokens={})
+        enabled = self.charm.config.get("mint-access-tokens")
+        if not enabled and not self._state.access_tokens:
+            return
+
+        relations = self.model.relations[AZURE_SERVICE_PRINCIPAL_RELATION_NAME]
+        requested = self._requested_access_tokens(relations) if enabled else {}
+        wanted = {
+            self._access_token_key(principal, scope): (principal, scope)
+            for principal, scopes in requested.values()
+            for scope in scopes
+        }
+
+        for key in set(self._state.access_tokens) - set(wanted):
+            self._remove_access_token(key)
+        now = time.time()
+        stale = False
+        for key, (principal, scope) in sorted(wanted.items()):
+            token = self._state.access_tokens.get(key)
+            if token is None:
+                self._mint_access_token(principal, scope)
+            elif token["refresh"] > now and (
+                (digest := self._credentials_digest(principal)) and token["credentials"] != digest
+            ):
+                # Minted with other credentials: due now, renewed with the other due tokens.
+                token["refresh"] = now
+                stale = True
+        if stale:
+            self._refresh_access_tokens(publish=False)
+        self._publish_access_tokens(relations, requested)
+
+    def _requested_access_tokens(
+        self, relations: list[ops.Relation]
+    ) -> dict[int, tuple[str, list[str]]]:
+        """Return the service principal and the scopes each relation asks tokens for."""
+        provider = self.azure_service_principal_provider
+        return {
+            relation.id: (self._relation_principal(relation), provider.requested_scopes(relation))
+            for relation in relations
+        }
+
+    def _publish_access_tokens(
+        self, relations: list[ops.Relation], requested: dict[int, tuple[str, list[str]]]
+    ) -> None:
+        """Share the tokens of the scopes each relation asks for, leaving the withdrawn ones out."""
+        provider = self.azure_service_principal_provider
         for relation in relations:
-            self.azure_service_principal_provider.update_response(relation, data)
+            principal, scopes = requested.get(relation.id, ("", []))
+            tokens = {}
+            for scope in scopes:
+                token = self._state.access_tokens.get(self._access_token_key(principal, scope))
+                if token and not token.get("withdrawn"):
+                    tokens[scope] = token["uri"]
+            provider.publish_access_tokens(relation, tokens)
+
+    @staticmethod
+    def _access_token_key(principal: str, scope: str) -> str:
+        """Identify the token of a scope, for a service principal, in the stored state."""
+        return json.dumps([principal, scope]) if principal else scope
+
+    def _refresh_access_tokens(self, publish: bool = True) -> None:
+        """Renew the access tokens that are due, the earliest first, a batch per hook.
+
+        The renewal time of every token is kept in the stored state, so finding the due
+        ones costs no hook tool. Those beyond the batch are renewed on the next hooks,
+        ahead of their expiry thanks to the skew. Tokens that expired before they could be
+        renewed are withdrawn from the relations, unless `publish` is unset.
+        """
+        if not self.charm.unit.is_leader() or not self.charm.config.get("mint-access-tokens"):
+            return
+
+        self._state.set_default(access_tokens={})
+        now = time.time()
+        due = sorted(
+            (token["refresh"], token["principal"], token["scope"])
+            for token in self._state.access_tokens.values()
+            if token["refresh"] <= now
+        )
+        if len(due) > ACCESS_TOKEN_REFRESH_BATCH:
+            self.logger.debug(
+                f"{len(due)} access tokens due, renewing {ACCESS_TOKEN_REFRESH_BATCH}."
+            )
+        withdrawn = [
+            scope
+            for _, principal, scope in due[:ACCESS_TOKEN_REFRESH_BATCH]
+            if self._mint_access_token(principal, scope) is None
+        ]
+        if withdrawn and publish:
+            relations = self.model.relations[AZURE_SERVICE_PRINCIPAL_RELATION_NAME]
+            self._publish_access_tokens(relations, self._requested_access_tokens(relations))
+
+    @staticmethod
+    def _access_token_refresh_time(scope: str, expires: float) -> float:
+        """Return when to renew a token, ahead of its expiry by the skew and a jitter.
+
+        The jitter is derived from the scope and expiry, to spread the renewals of tokens
+        minted together, and never exceeds half the token lifetime.
+        """
+        seed = hashlib.sha256(f"{scope}.{expires}".encode()).digest()
+        jitter = int.from_bytes(seed[:4], "big") / 0xFFFFFFFF * ACCESS_TOKEN_REFRESH_JITTER
+        lead = min(ACCESS_TOKEN_EXPIRY_SKEW + jitter, (expires - time.time()) / 2)
+        return expires - max(lead, 0)
+
+    def _mint_access_token(self, principal: str, scope: str) -> str | None:
+        """Return the URI of the secret holding a valid access token for a scope.
+
+        A new token is only requested when there is none yet, when it is about to expire,
+        or when the credentials changed. The secret holding it expires when it has to be
+        renewed, so that the renewal happens on `secret-expired` if no hook came before.
+        """
+        if (info := self.context.get_service_principal(principal)) is None:
+            self.logger.warning(f"Unknown service principal {principal!r} for {scope}.")
+            return None
+
+        authority_url = self.charm.config.get("authority-url") or ""
+        digest = self._credentials_digest(principal)
+        key = self._access_token_key(principal, scope)
+        token = self._state.access_tokens.get(key)
+        if token and token["credentials"] == digest and token["refresh"] > time.time():
+            return token["uri"]
+
+        try:
+            access_token, expires = mint_access_token(
+                authority_url,
+                info.tenant_id,
+                info.client_id,
+                info.client_secret,
+                scope,
+                timeout=CREDENTIALS_VALIDATION_TIMEOUT,
+            )
+        except (CredentialsRejectedError, ValidationUnavailableError) as e:
+            self.logger.warning(f"Could not mint an access token for {scope}: {e}")
+            if not token:
+                return None
+            # Let the other due tokens go first before trying again.
+            token["refresh"] = time.time() + CREDENTIALS_VALIDATION_RETRY
+            if self._access_token_expiry(token) <= time.time():
+                # An expired token is withdrawn until it is renewed.
+                self.logger.warning(f"The access token for {scope} expired, withdrawn.")
+                token["withdrawn"] = True
+                return None
+            # A token that has not expired yet is still better than none.
+            return token["uri"]
+
+        refresh = self._access_token_refresh_time(scope, expires)
+        content = {"access-token": access_token, "expires-on": str(int(expires))}
+        expire = datetime.fromtimestamp(refresh, tz=timezone.utc)
+        if token:
+            secret = self.model.get_secret(id=token["uri"])
+            secret.set_content(content)
+            secret.set_info(expire=expire)
+            uri = token["uri"]
+        else:
+            label = f"{ACCESS_TOKEN_SECRET_PREFIX}{hashlib.sha256(key.encode()).hexdigest()[:16]}"
+            secret = self.charm.app.add_secret(content, label=label, expire=expire)
+            uri = secret.id or secret.get_info().id
+
+        self._state.access_tokens[key] = {
+            "uri": uri,
+            "refresh": refresh,
+            "expires": expires,
+            "credentials": digest,
+            "principal": principal,
+            "scope": scope,
+        }
+        return uri
+
+    def _access_token_expiry(self, token: dict) -> float:
+        """Return when a stored access token expires.
+
+        Tokens minted by earlier versions only have their expiry in their secret.
+        """
+        if "expires" not in token:
+            try:
+                content = self.model.get_secret(id=token["uri"]).get_content()
+                token["expires"] = float(content.get("expires-on") or 0)
+            except (ops.SecretNotFoundError, ValueError):
+                token["expires"] = 0.0
+        return token["expires"]
+
+    def _credentials_digest(self, principal: str) -> str | None:
+        """Return the digest of the credentials tokens are minted with for a service principal."""
+        if (info := self.context.get_service_principal(principal)) is None:
+            return None
+        return credentials_digest(
+            self.charm.config.get("authority-url") or "",
+            info.tenant_id,
+            info.client_id,
+            info.client_secret,
+        )
+
+    def _remove_access_token(self, key: str) -> None:
+        """Remove the secret holding an access token."""
+        token = self._state.access_tokens.pop(key)
+        try:
+            self.model.get_secret(id=token["uri"]).remove_all_revisions()
+        except ops.SecretNotFoundError:
+            pass
+
+    def _on_relation_broken(self, event: ops.RelationBrokenEvent):
+        """Forget what was published to a relation that is going away."""
+        self._state.set_default(published_relations={}, relation_principals={})
+        self._state.published_relations.pop(str(event.relation.id), None)
+        self._state.relation_principals.pop(str(event.relation.id), None)
 
     def _on_azure_service_principal_info_requested(
-        self, _event: ServicePrincipalInfoRequestedEvent
+        self, event: "ServicePrincipalInfoRequestedEvent"
     ):
-        """Handle the azure_service_principal `info_requested` event."""
+        """Handle the azure_service_principal `info_requested` event.
+
+        The service principal the relation selects is kept in the stored state, so that
+        the other hooks do not read every relation to find out.
+        """
         self.logger.debug("Handling info-requested event.")
         if not self.charm.unit.is_leader():
             return
 
+        # The requirer may have selected another service principal: read it again.
+        self._state.set_default(relation_principals={})
+        self._state.relation_principals[str(event.relation.id)] = (
+            self.azure_service_principal_provider.requested_service_principal(event.relation)
+        )
         self._update_provider_data()
+
+    def _on_access_tokens_requested(self, _event: "AccessTokensRequestedEvent"):
+        """Handle the azure_service_principal `access_tokens_requested` event."""
+        self.logger.debug("Handling access-tokens-requested event.")
+        self._update_access_tokens()
@@ -0,0 +1,92 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Accounting of the hook tools invoked by the charm."""
+
+import functools
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from ops.model import _ModelBackend
+
+# Model backend methods and the hook tool each of them runs. `is_leader` is left out as ops
+# answers it from a lease cache most of the time.
+HOOK_TOOLS = {
+    "config_get": "config-get",
+    "relation_ids": "relation-ids",
+    "relation_list": "relation-list",
+    "relation_remote_app_name": "relation-list",
+    "relation_get": "relation-get",
+    "relation_set": "relation-set",
+    "secret_get": "secret-get",
+    "secret_info_get": "secret-info-get",
+    "secret_add": "secret-add",
+    "secret_set": "secret-set",
+    "secret_grant": "secret-grant",
+    "secret_revoke": "secret-revoke",
+    "secret_remove": "secret-remove",
+    "status_get": "status-get",
+    "status_set": "status-set",
+}
+
+
+def current_hook() -> str:
+    """Return the name of the hook or action being dispatched."""
+    dispatch_path = os.environ.get("JUJU_DISPATCH_PATH", "")
+    return dispatch_path.rpartition("/")[2] or os.environ.get("JUJU_HOOK_NAME", "unknown")
+
+
+class HookToolRecorder:
+    """Counts and times every hook-tool invocation made through a model backend.
+
+    The backend methods are wrapped in place, so that every component of the charm
+    sharing the backend is accounted for. Calls made before the recorder is created
+    are not recorded.
+    """
+
+    def __init__(self, backend: _ModelBackend):
+        self.calls: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+        for method, tool in HOOK_TOOLS.items():
+            if (original := getattr(backend, method, None)) is not None:
+                setattr(backend, method, self._record(tool, original))
+
+    def _record(self, tool: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a backend method so that its calls are counted and timed."""
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.calls[tool] = self.calls.get(tool, 0) + 1
+                self.seconds[tool] = self.seconds.get(tool, 0.0) + time.perf_counter() - start
+
+        return wrapper
+
+    def summary(self, hook: str) -> dict[str, Any]:
+        """Return the calls recorded so far, in a JSON serializable form."""
+        return {
+            "hook": hook,
+            "calls": sum(self.calls.values()),
+            "seconds": round(sum(self.seconds.values()), 6),
+            "tools": {
+                tool: {"calls": self.calls[tool], "seconds": round(self.seconds[tool], 6)}
+                for tool in sorted(self.calls)
+            },
+        }
+
+    def dump(self, path: Path, hook: str) -> None:
+        """Store the summary of this dispatch, alongside the latest one of every other hook."""
+        summaries = {}
+        if path.exists():
+            try:
+                summaries = json.loads(path.read_text())
+            except json.JSONDecodeError:
+                summaries = {}
+        summaries[hook] = self.summary(hook)
+        path.write_text(json.dumps(summaries, indent=2, sort_keys=True))
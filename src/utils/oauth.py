@@ -0,0 +1,150 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""OAuth2 client credentials flow against the Entra ID token endpoint.
+
+Used to validate the service principal credentials, and to mint access tokens on behalf
+of the consumers.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+
+class CredentialsRejectedError(Exception):
+    """The token endpoint rejected the credentials."""
+
+
+class ValidationUnavailableError(Exception):
+    """The token endpoint could not tell whether the credentials are valid."""
+
+
+@dataclass
+class ValidationResult:
+    """Outcome of a credentials validation, kept until `expires`.
+
+    `valid` is None when the token endpoint could not tell.
+    """
+
+    valid: bool | None
+    message: str
+    expires: float
+
+    def to_dict(self) -> dict:
+        """Return the result as a dictionary, to be kept in the stored state."""
+        return asdict(self)
+
+
+def token_endpoint(authority_url: str, tenant_id: str) -> str:
+    """Return the OAuth2 v2.0 token endpoint of a tenant."""
+    return f"{authority_url.rstrip('/')}/{tenant_id}/oauth2/v2.0/token"
+
+
+def credentials_digest(
+    authority_url: str, tenant_id: str, client_id: str, client_secret: str
+) -> str:
+    """Identify a set of credentials without keeping the client secret around."""
+    payload = json.dumps([authority_url, tenant_id, client_id, client_secret])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def request_token(
+    authority_url: str,
+    tenant_id: str,
+    client_id: str,
+    client_secret: str,
+    scope: str,
+    timeout: float,
+) -> dict:
+    """Run the OAuth2 client credentials flow and return the token response.
+
+    Raises:
+        CredentialsRejectedError: When the token endpoint rejects the credentials.
+        ValidationUnavailableError: When the token endpoint cannot be reached or fails.
+    """
+    # urllib pulls in http.client and email, only paid for when validation is enabled.
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+
+    body = urllib.parse.urlencode(
+        {
+            "grant_type": "client_credentials",
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "scope": scope,
+        }
+    ).encode()
+    request = urllib.request.Request(token_endpoint(authority_url, tenant_id), data=body)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            token = json.load(response)
+    except urllib.error.HTTPError as e:
+        if e.code not in (400, 401):
+            raise ValidationUnavailableError(f"The token endpoint failed with HTTP {e.code}.")
+        try:
+            error = json.load(e)
+        except ValueError:
+            error = {}
+        description = error.get("error_description") or error.get("error") or f"HTTP {e.code}"
+        raise CredentialsRejectedError(description.splitlines()[0])
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise ValidationUnavailableError(f"Could not reach the token endpoint: {e}")
+
+    if not isinstance(token, dict) or "access_token" not in token:
+        raise ValidationUnavailableError("The token endpoint returned no access token.")
+    return token
+
+
+def mint_access_token(
+    authority_url: str,
+    tenant_id: str,
+    client_id: str,
+    client_secret: str,
+    scope: str,
+    timeout: float,
+) -> tuple[str, float]:
+    """Request an access token for a scope, and return it with the time it expires at.
+
+    Raises:
+        CredentialsRejectedError: When the token endpoint rejects the request.
+        ValidationUnavailableError: When the token endpoint cannot be reached or fails, or
+            does not tell how long the token is valid for.
+    """
+    requested_at = time.time()
+    token = request_token(authority_url, tenant_id, client_id, client_secret, scope, timeout)
+    try:
+        expires_in = float(token["expires_in"])
+    except (KeyError, TypeError, ValueError):
+        raise ValidationUnavailableError("The token endpoint returned no token lifetime.")
+    return token["access_token"], requested_at + expires_in
+
+
+def validate_credentials(
+    authority_url: str,
+    tenant_id: str,
+    client_id: str,
+    client_secret: str,
+    scope: str,
+    timeout: float,
+    ttl: float,
+    retry: float,
+) -> ValidationResult:
+    """Validate the credentials against the token endpoint.
+
+    The result is kept for `ttl` seconds, or `retry` seconds if the endpoint could not tell.
+    """
+    try:
+        request_token(authority_url, tenant_id, client_id, client_secret, scope, timeout)
+    except CredentialsRejectedError as e:
+        logger.warning(f"The credentials were rejected: {e}")
+        return ValidationResult(False, f"Invalid credentials: {e}", time.time() + ttl)
+    except ValidationUnavailableError as e:
+        logger.warning(f"The credentials could not be validated: {e}")
+        return ValidationResult(None, f"Credentials not validated: {e}", time.time() + retry)
+    return ValidationResult(True, "", time.time() + ttl)
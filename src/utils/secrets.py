@@ -4,6 +4,7 @@
 """Utility functions related to secrets."""
 
 import logging
+import weakref
 
 import ops
 import ops.charm
@@ -15,6 +16,47 @@ import ops.model
 logger = logging.getLogger(__name__)
 
 
+class SecretContentCache:
+    """Resolved secret contents for the duration of a single dispatch.
+
+    Entries are keyed by secret URI, and hold the revision tracked by this unit, which
+    does not move within a dispatch once it has been refreshed.
+    """
+
+    def __init__(self):
+        self._contents: dict[str, dict[str, str]] = {}
+
+    def get(self, secret_id: str) -> dict[str, str] | None:
+        """Return the cached content of the secret, if any."""
+        return self._contents.get(secret_id)
+
+    def set(self, secret_id: str, content: dict[str, str]) -> None:
+        """Store the content of the secret."""
+        self._contents[secret_id] = content
+
+
+# A new ops.Model is created for every dispatch, so keying on it scopes the cache to one hook.
+_secret_content_caches: "weakref.WeakKeyDictionary[ops.Model, SecretContentCache]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_secret_content_cache(model: ops.Model) -> SecretContentCache:
+    """Return the secret content cache bound to the given model."""
+    if (cache := _secret_content_caches.get(model)) is None:
+        cache = _secret_content_caches[model] = SecretContentCache()
+    return cache
+
+
+def get_secret_content(model: ops.Model, secret_id: str) -> dict[str, str]:
+    """Return the latest content of the secret, fetching it at most once per dispatch."""
+    cache = get_secret_content_cache(model)
+    if (content := cache.get(secret_id)) is None:
+        content = model.get_secret(id=secret_id).get_content(refresh=True)
+        cache.set(secret_id, content)
+    return content
+
+
 def decode_secret_key(model: ops.Model, secret_id: str) -> dict[str, str] | None:
     """Decode the secret with a given secret_id and return "client-id" and "client-secret".
 
@@ -32,7 +74,7 @@ def decode_secret_key(model: ops.Model, secret_id: str) -> dict[str, str] | None
         A dictionary containing the 'client-id' and 'client-secret'.
     """
     try:
-        secret_content = model.get_secret(id=secret_id).get_content(refresh=True)
+        secret_content = get_secret_content(model, secret_id)
 
         for key in ["client-id", "client-secret"]:
             if not secret_content.get(key):
@@ -0,0 +1,82 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Benchmark report and baseline handling.
+
+Every benchmark records its measurements with the `benchmark_report` fixture. At the end
+of the session, all measurements and flagged regressions are written to a JSON report,
+`benchmark-report.json` by default (overridden with `BENCHMARK_REPORT`).
+
+Measurements are compared to `baseline.json`. Hook-tool call counts are deterministic and
+must not grow. Wall time and allocations are flagged when they exceed the baseline by more
+than `BENCHMARK_TOLERANCE` (a ratio, 2.0 by default). Run with `BENCHMARK_UPDATE_BASELINE=1`
+to store the current measurements as the new baseline instead.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+# Below these, differences are noise rather than regressions.
+MIN_SECONDS = 0.05
+MIN_BYTES = 1024 * 1024
+
+
+class BenchmarkReport:
+    """Measurements of a benchmark session, checked against the stored baseline."""
+
+    def __init__(self, baseline: dict, tolerance: float):
+        self.baseline = baseline
+        self.tolerance = tolerance
+        self.results: dict[str, dict[str, dict]] = {}
+        self.regressions: list[str] = []
+
+    def record(self, name: str, size: int, measurement: dict) -> list[str]:
+        """Store a measurement and return the regressions it shows against the baseline."""
+        self.results.setdefault(name, {})[str(size)] = measurement
+        if (expected := self.baseline.get(name, {}).get(str(size))) is None:
+            return []
+
+        regressions = []
+        label = f"{name}[{size}]"
+        if "calls" in expected and measurement.get("calls", 0) > expected["calls"]:
+            regressions.append(
+                f"{label}: {measurement['calls']} hook-tool calls, baseline {expected['calls']}"
+            )
+        for key, floor in (("seconds", MIN_SECONDS), ("peak-bytes", MIN_BYTES)):
+            if key not in expected or key not in measurement:
+                continue
+            limit = max(expected[key] * self.tolerance, expected[key] + floor)
+            if measurement[key] > limit:
+                regressions.append(f"{label}: {key} {measurement[key]}, baseline {expected[key]}")
+        self.regressions.extend(regressions)
+        return regressions
+
+    def to_dict(self) -> dict:
+        """Return the report in its JSON form."""
+        return {
+            "tolerance": self.tolerance,
+            "results": self.results,
+            "regressions": self.regressions,
+        }
+
+
+@pytest.fixture(scope="session")
+def benchmark_report(request: pytest.FixtureRequest):
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    report = BenchmarkReport(baseline, float(os.environ.get("BENCHMARK_TOLERANCE", "2.0")))
+
+    yield report
+
+    report_path = Path(os.environ.get("BENCHMARK_REPORT", "benchmark-report.json"))
+    report_path.write_text(json.dumps(report.to_dict(), indent=2, sort_keys=True))
+    if os.environ.get("BENCHMARK_UPDATE_BASELINE"):
+        BASELINE_PATH.write_text(json.dumps(report.results, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def update_baseline() -> bool:
+    return bool(os.environ.get("BENCHMARK_UPDATE_BASELINE"))
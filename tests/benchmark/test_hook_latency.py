@@ -0,0 +1,135 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Hook latency benchmarks of the azure-auth-integrator charm.
+
+Each hook is run against a growing number of `azure-service-principal-credentials`
+relations, measuring wall time, peak allocations and hook-tool calls.
+"""
+
+import dataclasses
+import json
+import os
+import time
+import tracemalloc
+from functools import cache
+from pathlib import Path
+
+import pytest
+import yaml
+from ops.testing import Context, Relation, Secret, State
+from src.charm import AzureAuthIntegratorCharm
+
+from utils.instrumentation import HookToolRecorder
+
+CONFIG = yaml.safe_load(Path("./config.yaml").read_text())
+METADATA = yaml.safe_load(Path("./metadata.yaml").read_text())
+
+RELATION_COUNTS = [1, 10, 100, 1000]
+ROUNDS = int(os.environ.get("BENCHMARK_ROUNDS", "3"))
+
+CREDENTIALS_SECRET = Secret(
+    tracked_content={
+        "client-id": "clientid",
+        "client-secret": "clientsecret",
+    }
+)
+
+
+def charm_context() -> Context[AzureAuthIntegratorCharm]:
+    charm_configuration = json.loads(json.dumps(CONFIG))
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = CREDENTIALS_SECRET.id
+    return Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+
+
+@cache
+def unpublished_state(relation_count: int) -> State:
+    """A leader unit related to consumers it has not published anything to yet."""
+    relations = [
+        Relation(endpoint="azure-service-principal-credentials") for _ in range(relation_count)
+    ]
+    return State(leader=True, relations=relations, secrets={CREDENTIALS_SECRET})
+
+
+@cache
+def published_state(relation_count: int) -> State:
+    """A leader unit that has published the credentials to all its consumers."""
+    ctx = charm_context()
+    return ctx.run(ctx.on.config_changed(), unpublished_state(relation_count))
+
+
+def config_changed(ctx: Context, relation_count: int):
+    return ctx.on.config_changed(), unpublished_state(relation_count)
+
+
+def update_status(ctx: Context, relation_count: int):
+    return ctx.on.update_status(), published_state(relation_count)
+
+
+def secret_changed(ctx: Context, relation_count: int):
+    state = published_state(relation_count)
+    rotated = dataclasses.replace(
+        CREDENTIALS_SECRET,
+        latest_content={"client-id": "clientid", "client-secret": "rotated"},
+    )
+    secrets = {secret for secret in state.secrets if secret.id != rotated.id} | {rotated}
+    return ctx.on.secret_changed(rotated), dataclasses.replace(state, secrets=secrets)
+
+
+def relation_joined(ctx: Context, relation_count: int):
+    state = published_state(relation_count - 1) if relation_count > 1 else unpublished_state(0)
+    relation = Relation(endpoint="azure-service-principal-credentials")
+    return ctx.on.relation_joined(relation), dataclasses.replace(
+        state, relations=[*state.relations, relation]
+    )
+
+
+def run_hook(ctx: Context, event, state: State) -> HookToolRecorder:
+    with ctx(event, state) as manager:
+        recorder = HookToolRecorder(manager.charm.model._backend)
+        manager.run()
+    return recorder
+
+
+@pytest.mark.parametrize("relation_count", RELATION_COUNTS)
+@pytest.mark.parametrize(
+    "hook",
+    [config_changed, secret_changed, update_status, relation_joined],
+    ids=lambda hook: hook.__name__,
+)
+def test_hook_latency(benchmark_report, update_baseline: bool, hook, relation_count: int):
+    """Measure a hook, and check it against the baseline."""
+    # Arrange
+    ctx = charm_context()
+    event, state = hook(ctx, relation_count)
+    name = hook.__name__.replace("_", "-")
+
+    # Act
+    seconds = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        recorder = run_hook(ctx, event, state)
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run_hook(ctx, event, state)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    summary = recorder.summary(name)
+    regressions = benchmark_report.record(
+        name,
+        relation_count,
+        {
+            "seconds": round(min(seconds), 6),
+            "peak-bytes": peak_bytes,
+            "calls": summary["calls"],
+            "tools": {tool: data["calls"] for tool, data in summary["tools"].items()},
+        },
+    )
+
+    # Assert
+    if regressions and not update_baseline:
+        pytest.fail("; ".join(regressions))
@@ -0,0 +1,51 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Import time benchmark of the azure-auth-integrator charm.
+
+Every hook starts a fresh interpreter, so the modules imported by `charm` are paid for on
+each dispatch. The relation libraries (pydantic and data_interfaces) are only imported by
+hooks that touch the relation.
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+LAZY_MODULES = (
+    "pydantic",
+    "charms.data_platform_libs.v1.data_interfaces",
+    "charms.azure_auth_integrator.v0.azure_service_principal",
+)
+IMPORT_TIME_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_charm() -> dict[str, int]:
+    """Import `charm` in a fresh interpreter and return the cumulative import time per module."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(["lib", "src"]))
+    env.pop("JUJU_DISPATCH_PATH", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import charm"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        match.group(3): int(match.group(1))
+        for line in result.stderr.splitlines()
+        if (match := IMPORT_TIME_LINE.match(line))
+    }
+
+
+def test_import_charm(benchmark_report):
+    # Act
+    modules = min((import_charm() for _ in range(3)), key=lambda modules: modules["charm"])
+
+    # Assert
+    regressions = benchmark_report.record(
+        "import_charm", 0, {"seconds": modules["charm"] / 1_000_000}
+    )
+    assert not [module for module in LAZY_MODULES if module in modules]
+    assert not regressions, "\n".join(regressions)
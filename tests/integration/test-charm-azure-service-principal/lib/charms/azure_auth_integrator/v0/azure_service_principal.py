@@ -128,6 +128,38 @@ in the `AzureServicePrincipalRequirer` instance, which returns a dictionary:
         }
 ```
 
+Use `get_azure_service_principal_info(fields_only=True)` to get the fields other than those stored
+in a secret, `client-id` and `client-secret`, without reading any secret. With `lazy=True`, a
+read-only mapping is returned instead of a dictionary, and the secret is only fetched the first
+time one of its fields is accessed.
+
+`get_azure_service_principal_info()` only reads the first relation. A charm related to several
+`azure-auth-integrator` applications, for instance one per subscription, can read them all at
+once, by relation id, and optionally only those of one application:
+
+```python
+        infos = self.azure_service_principal_client.get_all_service_principal_info(
+            remote_app="azure-auth-integrator-prod"
+        )
+        for relation_id, connection_info in infos.items():
+            process_connection_info(connection_info)
+```
+
+Providers may also mint access tokens on behalf of the requirer, so that requirers do not each
+request their own. The requirer leader asks for the scopes it needs, then reads the token of
+each scope once published. The event `access_token_changed` is fired whenever a token it was
+given is renewed:
+
+```python
+        self.azure_service_principal_client.request_access_tokens(
+            ["https://storage.azure.com/.default"]
+        )
+        ...
+        token = self.azure_service_principal_client.get_access_token(
+            "https://storage.azure.com/.default"
+        )
+```
+
 
 #### Provider charm
 
@@ -160,7 +192,7 @@ class ProviderCharm(CharmBase):
 
 Using this instance of class `AzureServicePrincipalProvider`, the provider charm then needs to listen
 to the custom event `service_principal_info_requested`, which is emitted when the integration with
-requirer charm is initially made.
+requirer charm is initially made, and whenever the requirer changes its databag.
 
 The relation data can be set and/or updated with the `update_response` method. To make sure the data
 stays updated, make sure to call this method whenever any of the provided credentials may have changed:
@@ -199,13 +231,36 @@ class ProviderCharm(CharmBase):
     def _update_provider_data(self, event: ServicePrincipalInfoRequestedEvent):
         # Gather data as a dictionary
         data = ...
-        # Get instances of the relation
-        relations = self.model.relations[AZURE_SERVICE_PRINCIPAL_RELATION_NAME]
-        for relation in relations:
-            self.azure_service_principal_provider.update_response(relation, data)
+        # Publish to every relation at once
+        self.azure_service_principal_provider.update_responses(data)
 
 ```
 
+By default, each relation gets its own secret holding the credentials. Pass `shared_secret=True`
+to publish them in a single secret granted to every relation instead, so that rotating the
+credentials costs one secret update however many requirers there are:
+
+```python
+        self.azure_service_principal_provider = AzureServicePrincipalProvider(
+            self,
+            relation_name=AZURE_SERVICE_PRINCIPAL_RELATION_NAME,
+            shared_secret=True,
+        )
+```
+
+Relations published to before switching to a shared secret are moved to it, and their own
+secret removed, the next time `update_responses` is called.
+
+A provider may serve several service principals. The requirer leader selects one by name with
+`request_service_principal(name)`, read on the provider side with
+`requested_service_principal(relation)`. Pass the name as `principal` to `update_responses`, so
+that each service principal gets its own shared secret.
+
+Access tokens requested by a requirer are announced with the `access_tokens_requested` event.
+`requested_scopes(relation)` lists the scopes asked for. A provider that mints tokens stores the
+token of each scope in a secret, in an `access-token` key, and publishes those secrets with
+`publish_access_tokens(relation, {scope: secret_uri})`.
+
 
 """
 
@@ -217,32 +272,54 @@ LIBAPI = 0
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 3
+LIBPATCH = 4
 
 
+import functools
+import hashlib
+import json
 import logging
-from typing import Dict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
 
 from charms.data_platform_libs.v1.data_interfaces import (
     BaseCommonModel,
+    CachedSecret,
     EventHandlers,
     ExtraSecretStr,
+    OpsRelationRepository,
     OpsRelationRepositoryInterface,
+    OptionalSecrets,
+    SecretCache,
     SecretString,
 )
 from ops.charm import (
     CharmBase,
     CharmEvents,
+    LeaderElectedEvent,
     RelationBrokenEvent,
     RelationChangedEvent,
     RelationJoinedEvent,
     RelationEvent,
     SecretChangedEvent,
+    SecretRemoveEvent,
 )
-from ops.framework import EventSource
-from ops.model import Relation
+from ops.framework import EventSource, StoredState
+from ops.model import Application, Model, ModelError, Relation, SecretNotFoundError, Unit
 
 from pydantic import (
+    BaseModel,
     Field,
 )
 
@@ -257,6 +334,13 @@ AZURE_SERVICE_PRINCIPAL_REQUIRED_INFO = [
     "client-secret",
 ]
 
+# The name of the service principal the requirer asks for, when the provider serves several.
+SERVICE_PRINCIPAL_FIELD = "service-principal"
+# The scopes the requirer asks access tokens for, as a JSON list in its databag.
+REQUESTED_SCOPES_FIELD = "requested-scopes"
+# The secrets holding the access token of each scope, as a JSON object in the provider databag.
+ACCESS_TOKENS_FIELD = "access-tokens"
+
 
 class ServicePrincipalEvent(RelationEvent):
     """Base class for Azure service principal events."""
@@ -282,17 +366,31 @@ class ServicePrincipalInfoGoneEvent(ServicePrincipalEvent):
     pass
 
 
+class AccessTokensRequestedEvent(ServicePrincipalEvent):
+    """Event for requesting access tokens from the interface."""
+
+    pass
+
+
+class AccessTokenChangedEvent(ServicePrincipalEvent):
+    """Event for the renewal of an access token shared over the interface."""
+
+    pass
+
+
 class AzureServicePrincipalRequirerEvents(CharmEvents):
     """Events for the AzureServicePrincipalRequirer side implementation."""
 
     service_principal_info_changed = EventSource(ServicePrincipalInfoChangedEvent)
     service_principal_info_gone = EventSource(ServicePrincipalInfoGoneEvent)
+    access_token_changed = EventSource(AccessTokenChangedEvent)
 
 
 class AzureServicePrincipalProviderEvents(CharmEvents):
     """Events for the AzureServicePrincipalProvider side implementation."""
 
     service_principal_info_requested = EventSource(ServicePrincipalInfoRequestedEvent)
+    access_tokens_requested = EventSource(AccessTokensRequestedEvent)
 
 
 class AzureServicePrincipalProviderModel(BaseCommonModel):
@@ -306,18 +404,162 @@ class AzureServicePrincipalProviderModel(BaseCommonModel):
     secret_extra: SecretString | None = Field(default=None)
 
 
+class _SecretFieldSpec(NamedTuple):
+    """A model field published in a secret, and the databag field referencing the secret."""
+
+    field: str
+    secret_group: str
+    aliased_field: str
+    secret_field: str
+
+
+@functools.cache
+def _secret_field_specs(model: Type[BaseModel]) -> Tuple[_SecretFieldSpec, ...]:
+    """Return the fields of a model published in secrets, following `data_interfaces`.
+
+    The layout only depends on the model class, so it is computed once per class.
+    """
+    specs = []
+    for field, field_info in model.model_fields.items():
+        if field_info.annotation in OptionalSecrets and len(field_info.metadata) == 1:
+            secret_group = field_info.metadata[0]
+            specs.append(
+                _SecretFieldSpec(
+                    field,
+                    secret_group,
+                    field_info.serialization_alias or field,
+                    f"{OpsRelationRepository.SECRET_FIELD_NAME}-{secret_group}",
+                )
+            )
+    return tuple(specs)
+
+
+def _encode_field(value: Any) -> Optional[str]:
+    """Encode a dumped model value the way `data_interfaces` stores it in a databag."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class _CountingSecretCache(SecretCache):
+    """The `data_interfaces` secret cache, counting the lookups it answered from memory.
+
+    Lookups that found no secret are remembered as well, until a secret is added under
+    the label, so that they are not repeated in the dispatch.
+    """
+
+    def __init__(self, model: Model, component: Application | Unit):
+        super().__init__(model, component)
+        self._missing: Set[Tuple[str, Optional[str]]] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, label: str, uri: Optional[str] = None) -> Optional[CachedSecret]:
+        """Return the secret of that label, looking it up on a miss."""
+        if self._secrets.get(label) or (label, uri) in self._missing:
+            self.hits += 1
+            return self._secrets.get(label)
+        self.misses += 1
+        if (secret := super().get(label, uri)) is None:
+            self._missing.add((label, uri))
+        return secret
+
+    def add(
+        self, label: str, content: Dict[str, str], relation: Optional[Relation] = None
+    ) -> CachedSecret:
+        """Create a secret under that label, granted to the relation if any."""
+        self._missing = {missing for missing in self._missing if missing[0] != label}
+        return super().add(label, content, relation)  # pyright: ignore[reportArgumentType]
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of lookups answered from memory, and of those that were not."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class ServicePrincipalInfoView(Mapping[str, str]):
+    """Read-only view of the Azure service principal info published on a relation.
+
+    Keys stored in a secret are only read, with the rest of the secret content, the first
+    time one of them is accessed. Those the secret does not hold, or all of them if the
+    secret cannot be read, are left out.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, str],
+        secret_keys: Dict[str, Tuple[str, str]],
+        load_secret: Callable[[str, str], Dict[str, str]],
+    ):
+        self._fields = fields
+        self._secret_keys = secret_keys
+        self._load_secret = load_secret
+        self._secrets: Dict[str, Dict[str, str]] = {}
+
+    def _secret_content(self, key: str) -> Dict[str, str]:
+        """Return the content of the secret a key is stored in, reading it the first time."""
+        secret_group, uri = self._secret_keys[key]
+        if secret_group not in self._secrets:
+            self._secrets[secret_group] = self._load_secret(secret_group, uri)
+        return self._secrets[secret_group]
+
+    def __getitem__(self, key: str) -> str:
+        if key in self._fields:
+            return self._fields[key]
+        if key not in self._secret_keys or (value := self._secret_content(key).get(key)) is None:
+            raise KeyError(key)
+        return value
+
+    @property
+    def fields(self) -> Dict[str, str]:
+        """The fields read from the databag."""
+        return dict(self._fields)
+
+    @property
+    def secret_uris(self) -> List[str]:
+        """The URIs of the secrets the databag references."""
+        return sorted({uri for _, uri in self._secret_keys.values()})
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._fields:
+            return True
+        return (
+            isinstance(key, str) and key in self._secret_keys and key in self._secret_content(key)
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._fields
+        yield from (key for key in self._secret_keys if key in self._secret_content(key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        # Secret-backed values are neither fetched nor shown.
+        shown = {**self._fields, **dict.fromkeys(self._secret_keys, "<secret>")}
+        return f"{type(self).__name__}({shown!r})"
+
+
 class AzureServicePrincipalRequirer(EventHandlers):
     """The requirer side of Azure service principal relation."""
 
     on = AzureServicePrincipalRequirerEvents()  # pyright: ignore[reportAssignmentType]
+    _stored = StoredState()
 
     def __init__(self, charm: CharmBase, relation_name: str, unique_key: str = ""):
         super().__init__(charm, relation_name, unique_key)
 
         self.response_model = AzureServicePrincipalProviderModel
+        self._secret_field_specs = _secret_field_specs(self.response_model)
         self.interface = OpsRelationRepositoryInterface(
             charm.model, relation_name, self.response_model
         )
+        # The snapshot key of the info last announced on each relation, and how many
+        # times each secret it references was seen changing, to only announce actual changes.
+        self._stored.set_default(snapshots={}, secret_generations={})
+        # The info read in this dispatch, per relation id.
+        self._infos: Dict[int, ServicePrincipalInfoView] = {}
+        # The secrets looked up in this dispatch, whatever the relation.
+        self._secrets = _CountingSecretCache(charm.model, charm.app)
 
         self.framework.observe(
             self.charm.on[self.relation_name].relation_changed, self._on_relation_changed_event
@@ -330,24 +572,161 @@ class AzureServicePrincipalRequirer(EventHandlers):
 
         self.framework.observe(self.charm.on.secret_changed, self._on_secret_changed_event)
 
-    def get_azure_service_principal_info(self) -> Dict[str, str]:
-        """Return the Azure service principal info as a dictionary."""
+    def secret_cache_stats(self) -> Dict[str, int]:
+        """Return the hits and misses of the secret cache in this dispatch."""
+        return self._secrets.stats()
+
+    def get_azure_service_principal_info(
+        self, fields_only: bool = False, lazy: bool = False
+    ) -> Mapping[str, str]:
+        """Return the Azure service principal info as a dictionary.
+
+        With `fields_only`, the fields stored in secrets are left out and no secret is read.
+        With `lazy`, a read-only mapping is returned instead, which only reads the secrets
+        the first time one of their fields is accessed.
+        """
         if not self.relations:
             return {}
 
-        model = self.interface.build_model(self.relations[0].id, component=self.relations[0].app)
-        if not model:
-            return {}
+        return self._get_info(self.relations[0], fields_only, lazy)
+
+    def get_all_service_principal_info(
+        self, remote_app: Optional[str] = None, fields_only: bool = False, lazy: bool = False
+    ) -> Dict[int, Mapping[str, str]]:
+        """Return the Azure service principal info of every relation, by relation id.
 
+        With `remote_app`, only the relations to the application of that name are returned.
+        The info is read as with `get_azure_service_principal_info`, and the secrets of all the
+        relations are read through the same secret cache.
+        """
         return {
-            key.replace("_", "-"): getattr(model, key)
-            for key in vars(model)
-            if (value := getattr(model, key)) is not None
+            relation.id: self._get_info(relation, fields_only, lazy)
+            for relation in self.relations
+            if relation.app and not (remote_app and relation.app.name != remote_app)
         }
 
+    def request_service_principal(self, name: str, relation: Optional[Relation] = None) -> None:
+        """Ask the provider for the service principal of that name, on every relation by default.
+
+        Only the leader unit can make the request. An empty name asks for the provider's
+        default service principal.
+        """
+        if not self.charm.unit.is_leader():
+            return
+        for relation in [relation] if relation else self.relations:
+            local = relation.data[self.charm.app]
+            if local.get(SERVICE_PRINCIPAL_FIELD, "") != name:
+                local[SERVICE_PRINCIPAL_FIELD] = name
+
+    def request_access_tokens(
+        self, scopes: List[str], relation: Optional[Relation] = None
+    ) -> None:
+        """Ask the provider for access tokens for the given scopes, on every relation by default.
+
+        Only the leader unit can make the request. Providers that mint access tokens
+        publish one for each scope, see `get_access_token`.
+        """
+        if not self.charm.unit.is_leader():
+            return
+        requested = json.dumps(sorted(set(scopes))) if scopes else ""
+        for relation in [relation] if relation else self.relations:
+            local = relation.data[self.charm.app]
+            if local.get(REQUESTED_SCOPES_FIELD, "") != requested:
+                local[REQUESTED_SCOPES_FIELD] = requested
+
+    def get_access_token(self, scope: str, relation: Optional[Relation] = None) -> Optional[str]:
+        """Return the access token published for a scope, on the first relation by default.
+
+        None is returned until the provider has published a token for the scope.
+        """
+        relation = relation or (self.relations[0] if self.relations else None)
+        if not relation:
+            return None
+        uri = _access_token_uris(relation).get(scope)
+        if not uri:
+            return None
+        try:
+            content = self.charm.model.get_secret(id=uri).get_content(refresh=True)
+        except (SecretNotFoundError, ModelError) as e:
+            logger.warning(f"Access token for scope {scope} not readable: {e}")
+            return None
+        return content.get("access-token")
+
+    def _get_info(self, relation: Relation, fields_only: bool, lazy: bool) -> Mapping[str, str]:
+        """Return the info published on a relation, as requested by the public getters."""
+        if fields_only:
+            return self._read_fields(relation)
+        info = self._read_info(relation)
+        return info if lazy else dict(info)
+
+    def _read_fields(self, relation: Relation) -> Dict[str, str]:
+        """Return the non-empty fields of the provider databag."""
+        if relation.id in self._infos:
+            return self._infos[relation.id].fields
+        data = dict(relation.data[relation.app]) if relation.app else {}
+        data.pop("data", None)
+        data.pop(ACCESS_TOKENS_FIELD, None)
+        return {key: value for key, value in data.items() if value}
+
+    def _read_info(self, relation: Relation) -> "ServicePrincipalInfoView":
+        """Return the info published on a relation, memoized for the dispatch."""
+        if relation.id in self._infos:
+            return self._infos[relation.id]
+
+        fields = self._read_fields(relation)
+        secret_keys = {}
+        for spec in self._secret_field_specs:
+            if uri := fields.get(spec.secret_field):
+                secret_keys[spec.aliased_field] = (spec.secret_group, uri)
+
+        def load_secret(secret_group: str, uri: str) -> Dict[str, str]:
+            secret = self._secrets.get(_requirer_secret_label(relation, secret_group, uri), uri)
+            return secret.get_content() if secret else {}
+
+        self._infos[relation.id] = ServicePrincipalInfoView(fields, secret_keys, load_secret)
+        return self._infos[relation.id]
+
+    def _snapshot_key(self, relation: Relation, info: "ServicePrincipalInfoView") -> str:
+        """Identify the info by its databag fields and the generation of its secrets.
+
+        The generations of the secrets the relation no longer references are dropped.
+        """
+        known = self._stored.secret_generations.get(str(relation.id), {})
+        generations = {uri: known.get(uri, 0) for uri in info.secret_uris}
+        if set(known) - set(generations):
+            self._stored.secret_generations[str(relation.id)] = {
+                uri: generation for uri, generation in known.items() if uri in generations
+            }
+        payload = json.dumps({"fields": info.fields, "secrets": generations}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _announce_if_changed(self, relation: Relation, unit: Optional[Unit] = None) -> None:
+        """Emit `service_principal_info_changed` if the info differs from the last one announced."""
+        info = self._read_info(relation)
+        missing_options = [
+            option for option in AZURE_SERVICE_PRINCIPAL_REQUIRED_INFO if option not in info
+        ]
+        if missing_options:
+            logger.warning(
+                f"Some mandatory fields: {missing_options} are not present, do not emit credential change event!"
+            )
+            return
+
+        key = self._snapshot_key(relation, info)
+        if self._stored.snapshots.get(str(relation.id)) == key:
+            logger.debug(f"Azure service principal info unchanged on relation {relation.id}.")
+            return
+        self._stored.snapshots[str(relation.id)] = key
+        getattr(self.on, "service_principal_info_changed").emit(
+            relation, app=relation.app, unit=unit
+        )
+
     def _on_relation_broken_event(self, event: RelationBrokenEvent) -> None:
         """Event handler for handling relation_broken event."""
         logger.info("Azure service principal relation broken...")
+        self._stored.snapshots.pop(str(event.relation.id), None)
+        self._stored.secret_generations.pop(str(event.relation.id), None)
+        self._infos.pop(event.relation.id, None)
         getattr(self.on, "service_principal_info_gone").emit(
             event.relation, app=event.app, unit=event.unit
         )
@@ -356,60 +735,159 @@ class AzureServicePrincipalRequirer(EventHandlers):
         """Notify the charm about the presence of Azure service principal credentials."""
         logger.info(f"Azure service principal relation ({event.relation.name}) changed...")
 
-        # Copy response to the local application databag
-        model = self.interface.build_model(
-            event.relation.id, component=self.relations[event.relation.id].app
-        )
-        self.interface.write_model(event.relation.id, model)
-
-        # check if the mandatory options are in the relation data
-        contains_required_options = True
-        credentials = self.get_azure_service_principal_info()
-        missing_options = []
-        for configuration_option in AZURE_SERVICE_PRINCIPAL_REQUIRED_INFO:
-            if configuration_option not in credentials:
-                contains_required_options = False
-                missing_options.append(configuration_option)
-
-        # emit credential change event only if all mandatory fields are present
-        if contains_required_options:
-            getattr(self.on, "service_principal_info_changed").emit(
-                event.relation, app=event.app, unit=event.unit
-            )
-        else:
-            logger.warning(
-                f"Some mandatory fields: {missing_options} are not present, do not emit credential change event!"
-            )
+        # The databag may have changed since it was read in this dispatch.
+        self._infos.pop(event.relation.id, None)
+        if self.charm.unit.is_leader():
+            self._record_last_seen_response(event.relation)
+        self._announce_if_changed(event.relation, event.unit)
+
+    def _record_last_seen_response(self, relation: Relation) -> None:
+        """Copy the provider response to the local application databag, if it differs.
+
+        Secrets are referenced by their URI rather than copied.
+        """
+        secret_values = {spec.field for spec in self._secret_field_specs}
+        keys = [
+            field.replace("_", "-")
+            for field in self.response_model.model_fields
+            if field not in secret_values
+        ]
+
+        response = self._read_fields(relation)
+        local = relation.data[self.charm.app]
+        changes = {
+            key: response.get(key, "")
+            for key in keys
+            if local.get(key) != response.get(key) and (key in local or key in response)
+        }
+        if not changes:
+            return
 
-    def _on_secret_changed_event(self, _event: SecretChangedEvent) -> None:
-        """Event handler for handling a new value of a secret."""
-        pass
+        for secret_field in {spec.secret_field for spec in self._secret_field_specs}:
+            if secret_field in changes and (previous := local.get(secret_field)):
+                # Earlier versions copied the secrets; drop the copies.
+                _remove_owned_secret(self.charm.model, previous)
+        # Committed in a single relation-set.
+        local.update(changes)
+
+    def _on_secret_changed_event(self, event: SecretChangedEvent) -> None:
+        """Announce the new info on the relations whose secret changed."""
+        for relation in self.relations:
+            if event.secret.id and event.secret.id in _access_token_uris(relation).values():
+                getattr(self.on, "access_token_changed").emit(relation, app=relation.app)
+                continue
+            info = self._read_info(relation)
+            uris = info.secret_uris
+            # Requirer-side labels are set when the secret is first read.
+            labels = {
+                _requirer_secret_label(relation, spec.secret_group, info.fields[spec.secret_field])
+                for spec in self._secret_field_specs
+                if spec.secret_field in info.fields
+            }
+            if not (event.secret.label in labels or event.secret.id in uris):
+                continue
+            known = self._stored.secret_generations.get(str(relation.id), {})
+            self._stored.secret_generations[str(relation.id)] = {
+                uri: known.get(uri, 0) + 1 for uri in uris
+            }
+            # The secret content is read again on next access.
+            self._infos.pop(relation.id, None)
+            self._announce_if_changed(relation)
+
+
+def _access_token_uris(relation: Relation, app: Optional[Application] = None) -> Dict[str, str]:
+    """Return the URI of the secret holding the access token of each scope.
+
+    The tokens are read from the provider application, the remote one by default.
+    """
+    app = app or relation.app
+    if not app:
+        return {}
+    try:
+        uris = json.loads(relation.data[app].get(ACCESS_TOKENS_FIELD) or "{}")
+    except ValueError:
+        return {}
+    return uris if isinstance(uris, dict) else {}
+
+
+def _remove_owned_secret(model: Model, uri: str) -> None:
+    """Remove a secret if this application owns it."""
+    try:
+        secret = model.get_secret(id=uri)
+        secret.get_info()
+    except (SecretNotFoundError, ModelError):
+        # Not found, or not ours to remove.
+        return
+    secret.remove_all_revisions()
+
+
+def _secret_label(relation: Relation, secret_group: str) -> str:
+    """Return the label of the secret holding a group of fields published on a relation."""
+    return f"{relation.name}.{relation.id}.{secret_group}.secret"
+
+
+def _requirer_secret_label(relation: Relation, secret_group: str, uri: str) -> str:
+    """Return the label a requirer gives a secret published on a relation.
+
+    The label names the secret as well as the relation: once the provider switches the
+    relation to another secret, the label of the previous one must not be found instead.
+    """
+    secret_id = uri.rsplit("/", 1)[-1].rsplit(":", 1)[-1]
+    return f"{relation.name}.{relation.id}.{secret_group}.{secret_id}.secret"
+
+
+def _content_digest(content: Dict[str, str]) -> str:
+    """Return a SHA-256 digest of a secret content."""
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
 
 
 class AzureServicePrincipalProvider(EventHandlers):
     """The provider side of Azure service principal relation."""
 
     on = AzureServicePrincipalProviderEvents()  # pyright: ignore[reportAssignmentType]
-
-    def __init__(self, charm: CharmBase, relation_name: str, unique_key: str = ""):
+    _stored = StoredState()
+
+    def __init__(
+        self,
+        charm: CharmBase,
+        relation_name: str,
+        unique_key: str = "",
+        shared_secret: bool = False,
+    ):
         super().__init__(charm, relation_name, unique_key)
 
         self.response_model = AzureServicePrincipalProviderModel
+        self._secret_field_specs = _secret_field_specs(self.response_model)
         self.interface = OpsRelationRepositoryInterface(
             charm.model, relation_name, self.response_model
         )
+        # Publish the credentials in a single secret granted to every relation,
+        # instead of one secret per relation.
+        self.shared_secret = shared_secret
+        # The URI and content digest of every secret published, so that secrets
+        # already holding the right content are neither read nor written.
+        self._stored.set_default(published_secrets={})
+        # The secrets looked up in this dispatch, whatever the relation.
+        self._secrets = _CountingSecretCache(charm.model, charm.app)
 
         self.framework.observe(
             self.charm.on[self.relation_name].relation_joined,
             self._on_relation_joined_event,
         )
 
+        self.framework.observe(
+            self.charm.on[self.relation_name].relation_broken,
+            self._on_relation_broken_event,
+        )
+
         self.framework.observe(
             self.charm.on[self.relation_name].relation_changed, self._on_relation_changed_event
         )
 
         self.framework.observe(self.charm.on.secret_changed, self._on_secret_changed_event)
 
+        self.framework.observe(self.charm.on.leader_elected, self._on_leader_elected_event)
+
     def _on_relation_joined_event(self, event: RelationJoinedEvent) -> None:
         """Event handler for handling the relation_joined event."""
         logger.info("Azure service principal relation joined...")
@@ -421,20 +899,237 @@ class AzureServicePrincipalProvider(EventHandlers):
             event.relation, app=event.app, unit=event.unit
         )
 
-    def _on_relation_changed_event(self, _event: RelationChangedEvent) -> None:
-        """Event handler for handling the relation_changed event."""
-        pass
+    def _on_relation_changed_event(self, event: RelationChangedEvent) -> None:
+        """Relay the requests of the requirer: the service principal, and access tokens if any."""
+        if not self.charm.unit.is_leader() or not event.app:
+            return
+
+        # The requirer may have selected another service principal.
+        self.on.service_principal_info_requested.emit(
+            event.relation, app=event.app, unit=event.unit
+        )
+        if REQUESTED_SCOPES_FIELD in event.relation.data[event.app]:
+            self.on.access_tokens_requested.emit(event.relation, app=event.app, unit=event.unit)
+
+    def secret_cache_stats(self) -> Dict[str, int]:
+        """Return the hits and misses of the secret cache in this dispatch."""
+        return self._secrets.stats()
+
+    def requested_service_principal(self, relation: Relation) -> str:
+        """Return the name of the service principal the requirer asks for, empty by default."""
+        if not relation.app:
+            return ""
+        return relation.data[relation.app].get(SERVICE_PRINCIPAL_FIELD, "")
+
+    def requested_scopes(self, relation: Relation) -> List[str]:
+        """Return the scopes the requirer asks access tokens for."""
+        if not relation.app:
+            return []
+        try:
+            scopes = json.loads(relation.data[relation.app].get(REQUESTED_SCOPES_FIELD) or "[]")
+        except ValueError:
+            logger.warning(f"Invalid {REQUESTED_SCOPES_FIELD} on relation {relation.id}.")
+            return []
+        if not isinstance(scopes, list):
+            return []
+        return sorted({scope for scope in scopes if isinstance(scope, str) and scope})
+
+    def publish_access_tokens(self, relation: Relation, tokens: Dict[str, str]) -> None:
+        """Publish the secrets holding the access token of each scope to a requirer.
+
+        `tokens` maps each scope to the URI of the secret holding its token, in an
+        `access-token` key. Secrets new to the relation are granted to it, scopes left
+        out are withdrawn and their secrets revoked from it.
+        """
+        published = _access_token_uris(relation, self.charm.app)
+        for uri in set(tokens.values()) - set(published.values()):
+            self.charm.model.get_secret(id=uri).grant(relation)
+        for uri in set(published.values()) - set(tokens.values()):
+            try:
+                self.charm.model.get_secret(id=uri).revoke(relation)
+            except (SecretNotFoundError, ModelError) as e:
+                # Removed already, along with its grants.
+                logger.debug(f"Access token secret {uri} not revoked: {e}")
+        if tokens != published:
+            data = relation.data[self.charm.app]
+            data[ACCESS_TOKENS_FIELD] = json.dumps(tokens, sort_keys=True) if tokens else ""
+
+    def _on_relation_broken_event(self, event: RelationBrokenEvent) -> None:
+        """Forget the secrets published to a relation that is going away."""
+        prefix = f"{event.relation.id}."
+        for key in [key for key in self._stored.published_secrets if key.startswith(prefix)]:
+            del self._stored.published_secrets[key]
 
     def _on_secret_changed_event(self, _event: SecretChangedEvent) -> None:
         """Event handler for handling a new value of a secret."""
         pass
 
-    def update_response(self, relation: Relation, response_data) -> None:
+    def _on_leader_elected_event(self, _event: LeaderElectedEvent) -> None:
+        """Forget the secrets published, another leader may have updated them since."""
+        self._stored.published_secrets = {}
+
+    def _on_secret_remove_event(self, event: SecretRemoveEvent) -> None:
+        """Remove the revisions of the shared secret that no requirer tracks anymore."""
+        if event.secret.label and event.secret.label.startswith(self._shared_secret_prefix):
+            event.remove_revision()
+            return
+        super()._on_secret_remove_event(event)
+
+    @property
+    def _shared_secret_prefix(self) -> str:
+        return f"{self.relation_name}.shared."
+
+    def update_response(self, relation: Relation, response_data: Mapping[str, str]) -> None:
         """Update the response to the requirer."""
-        model = self.interface.build_model(relation.id)
-        model.subscription_id = response_data["subscription-id"]
-        model.tenant_id = response_data["tenant-id"]
-        for field in ("client-id", "client-secret"):
-            attr_name = field.replace("-", "_")
-            setattr(model, attr_name, response_data[field])
-        self.interface.write_model(relation.id, model)
+        self.update_responses(response_data, [relation])
+
+    def update_responses(
+        self,
+        response_data: Mapping[str, str],
+        relations: Optional[List[Relation]] = None,
+        principal: str = "",
+    ) -> None:
+        """Publish the same response to several requirers, all of them by default.
+
+        A provider serving several service principals names the one the response belongs
+        to with `principal`, so that each gets its own shared secret.
+
+        The response can be any mapping, a read-only one included, and is only read. It is
+        validated and serialized once. Each relation then only pays for reading its
+        databag, writing the fields that differ in one go, and creating or updating its
+        secret.
+
+        With a shared secret, the secret is updated once whatever the number of
+        relations, and each relation is only granted access to it the first time.
+        """
+        relations = self.relations if relations is None else relations
+        if not relations:
+            return
+
+        response = self.response_model.model_validate(
+            {field: response_data[field] for field in AZURE_SERVICE_PRINCIPAL_REQUIRED_INFO}
+        )
+        specs = self._secret_field_specs
+
+        # The secret content of each group, shared by all relations.
+        contents: Dict[str, Dict[str, str]] = {}
+        for spec in specs:
+            if value := _encode_field(getattr(response, spec.field)):
+                contents.setdefault(spec.secret_group, {})[spec.aliased_field] = value
+        excluded = {spec.field for spec in specs} | {
+            spec.secret_field.replace("-", "_") for spec in specs
+        }
+        fields = {
+            field: encoded
+            for field, value in response.model_dump(mode="json", exclude=excluded).items()
+            if (encoded := _encode_field(value)) is not None
+        }
+
+        shared = (
+            {
+                group: self._publish_shared_secret(group, content, principal)
+                for group, content in contents.items()
+            }
+            if self.shared_secret
+            else {}
+        )
+        for relation in relations:
+            self._write_response(relation, fields, contents, shared)
+
+    def _published_secret_uri(self, key: str, content: Dict[str, str]) -> Optional[str]:
+        """Return the URI of the secret published under a key, if it already holds the content."""
+        published = self._stored.published_secrets.get(key)
+        if published and published["digest"] == _content_digest(content):
+            return published["uri"]
+        return None
+
+    def _record_published_secret(self, key: str, uri: str, content: Dict[str, str]) -> None:
+        """Remember that the secret published under a key holds the content."""
+        self._stored.published_secrets[key] = {"uri": uri, "digest": _content_digest(content)}
+
+    def _publish_shared_secret(
+        self, secret_group: str, content: Dict[str, str], principal: str = ""
+    ) -> Tuple[CachedSecret, str]:
+        """Create or update the secret shared by all relations, and return it with its URI."""
+        name = f"{principal}.{secret_group}" if principal else secret_group
+        label = f"{self._shared_secret_prefix}{name}.secret"
+        key = f"shared.{name}"
+        if uri := self._published_secret_uri(key, content):
+            # Nothing to update, the secret is only looked up if it has to be granted.
+            return CachedSecret(self.charm.model, self.charm.app, label, uri), uri
+
+        published = self._stored.published_secrets.get(key)
+        secret = self._secrets.get(label)
+        if secret is None:
+            secret = self._secrets.add(label, content)
+        elif published:
+            # The content is known to differ, no need to read it back to compare.
+            secret.meta.set_content(content)
+        else:
+            secret.set_content(content)
+        meta = secret.meta
+        # Secrets looked up by label do not know their URI.
+        uri = meta.id or (published and published["uri"]) or meta.get_info().id
+        self._record_published_secret(key, uri, content)
+        return secret, uri
+
+    def _withdraw_secret(self, relation: Relation, label: str, uri: str) -> None:
+        """Withdraw the secret a relation was given before the shared one it switches to.
+
+        The secret of its own the relation was given is removed. It is only looked up by
+        its label: the previous URI may be that of another shared secret, still used by
+        other relations, whose grant to this relation is revoked instead.
+        """
+        if self._secrets.get(label):
+            self._secrets.remove(label)
+            return
+        try:
+            self.charm.model.get_secret(id=uri).revoke(relation)
+        except (SecretNotFoundError, ModelError) as e:
+            logger.debug(f"Secret {uri} not revoked from relation {relation.id}: {e}")
+
+    def _write_response(
+        self,
+        relation: Relation,
+        fields: Dict[str, str],
+        contents: Dict[str, Dict[str, str]],
+        shared: Dict[str, Tuple[CachedSecret, str]],
+    ) -> None:
+        """Write a serialized response to a single relation."""
+        stored = relation.data[self.charm.app]
+        changes = {field: value for field, value in fields.items() if stored.get(field) != value}
+
+        for secret_group, content in contents.items():
+            secret_field = f"{OpsRelationRepository.SECRET_FIELD_NAME}-{secret_group}"
+            label = _secret_label(relation, secret_group)
+            if secret_group in shared:
+                shared_secret, uri = shared[secret_group]
+                if stored.get(secret_field) == uri:
+                    continue
+                shared_secret.meta.grant(relation)
+                if previous := stored.get(secret_field):
+                    self._withdraw_secret(relation, label, previous)
+                changes[secret_field] = uri
+                continue
+
+            key = f"{relation.id}.{secret_group}"
+            uri = stored.get(secret_field)
+            if uri and self._published_secret_uri(key, content) == uri:
+                continue
+
+            secret = self._secrets.get(label, uri)
+            if secret is None:
+                secret = self._secrets.add(label, content, relation)
+            else:
+                secret.set_content(content)
+            if not secret.meta:
+                continue
+            # Secrets looked up by label do not always know their URI.
+            if secret.meta.id and uri != secret.meta.id:
+                uri = changes[secret_field] = secret.meta.id
+            if uri:
+                self._record_published_secret(key, uri, content)
+
+        if changes:
+            # Committed in a single relation-set.
+            stored.update(changes)
@@ -72,7 +72,7 @@ class ApplicationCharm(CharmBase):
 
     def _on_update_status(self, _):
         service_principal_info = (
-            self.azure_service_principal_client.get_azure_service_principal_info()
+            self.azure_service_principal_client.get_azure_service_principal_info(fields_only=True)
         )
         if service_principal_info:
             logger.debug(f"Azure service principal client info: {service_principal_info}")
@@ -79,13 +79,13 @@ def test_config_options(juju: jubilant.Juju):
     )
     assert status.apps[APP_NAME].app_status.message == f"The secret '{secret_uri}' does not exist."
 
-    # Add a secret but don't grant permission, so status should stay blocked
-    logger.info("Add a secret but don't grant permission, status should stay blocked.")
+    # Add a secret but don't grant permission, so status should be waiting for the grant
+    logger.info("Add a secret but don't grant permission, status should be waiting.")
     secret_uri = juju.add_secret(SECRET_IDENTIFIER, {"client-id": CLIENT_ID_TEST_VALUE})
     juju.wait(jubilant.all_agents_idle, delay=15.0)
     juju.config(APP_NAME, {"credentials": secret_uri})
     juju.wait(jubilant.all_agents_idle, delay=15.0)
-    status = juju.wait(lambda status: jubilant.all_blocked(status, APP_NAME))
+    status = juju.wait(lambda status: jubilant.all_waiting(status, APP_NAME))
     assert (
         status.apps[APP_NAME].app_status.message
         == f"Permission for secret '{secret_uri}' has not been granted."
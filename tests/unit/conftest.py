@@ -0,0 +1,82 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Fixtures shared by the unit tests."""
+
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class TokenServer:
+    """Local stand-in for the Entra ID token endpoint.
+
+    Issues a token, valid for `expires_in` seconds, to the clients in `clients` (client id
+    -> client secret), and rejects the others like Entra ID does. With `status` set, every
+    request fails with that status. With `expires_in` unset, the lifetime is left out.
+    """
+
+    def __init__(self):
+        self.clients: dict[str, str] = {}
+        self.status: int | None = None
+        self.expires_in: int | None = 3599
+        self.requests: list[dict[str, str]] = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = dict(urllib.parse.parse_qsl(self.rfile.read(length).decode()))
+                server.requests.append({"path": self.path, **form})
+                self._respond(*server.respond(form))
+
+            def _respond(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def respond(self, form: dict[str, str]) -> tuple[int, dict]:
+        """Return the status and body answering a token request."""
+        if self.status:
+            return self.status, {"error": "temporarily_unavailable"}
+        if form.get("grant_type") != "client_credentials":
+            return 400, {"error": "unsupported_grant_type"}
+        if self.clients.get(form.get("client_id", "")) != form.get("client_secret"):
+            return 401, {
+                "error": "invalid_client",
+                "error_description": "AADSTS7000215: Invalid client secret provided.",
+            }
+        token = {"token_type": "Bearer", "access_token": f"token-{len(self.requests)}"}
+        if self.expires_in is not None:
+            token["expires_in"] = self.expires_in
+        return 200, token
+
+    def start(self) -> None:
+        """Serve token requests in a background thread."""
+        threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture()
+def token_server():
+    server = TokenServer()
+    server.start()
+    yield server
+    server.stop()
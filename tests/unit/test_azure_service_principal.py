@@ -0,0 +1,439 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Unit tests for the requirer side of the azure_service_principal library."""
+
+import dataclasses
+import json
+
+from charms.azure_auth_integrator.v0.azure_service_principal import (
+    AzureServicePrincipalRequirer,
+)
+from ops import CharmBase
+from ops.testing import Context, Relation, Secret, State
+
+RELATION_NAME = "azure-service-principal-credentials"
+METADATA = {
+    "name": "requirer",
+    "requires": {RELATION_NAME: {"interface": "azure_service_principal"}},
+}
+
+
+class RequirerCharm(CharmBase):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.azure_service_principal_client = AzureServicePrincipalRequirer(self, RELATION_NAME)
+
+
+def published_state() -> tuple[Relation, State]:
+    """A requirer related to a provider that published the service principal."""
+    secret = Secret(tracked_content={"client-id": "clientid", "client-secret": "clientsecret"})
+    relation = Relation(
+        endpoint=RELATION_NAME,
+        remote_app_data={
+            "subscription-id": "subscriptionid",
+            "tenant-id": "tenantid",
+            "secret-extra": secret.id,
+        },
+    )
+    return relation, State(relations=[relation], secrets={secret})
+
+
+def record_secret_gets(manager) -> list[str]:
+    """Record every secret-get made during the dispatch."""
+    backend = manager.charm.model._backend
+    secret_get = backend.secret_get
+    calls = []
+
+    def _secret_get(*args, **kwargs):
+        calls.append(kwargs.get("id") or kwargs.get("label"))
+        return secret_get(*args, **kwargs)
+
+    backend.secret_get = _secret_get
+    return calls
+
+
+def secret_generations(state: State) -> dict:
+    """Return the secret generations stored by the requirer."""
+    stored = next(
+        stored for stored in state.stored_states if "secret_generations" in stored.content
+    )
+    return stored.content["secret_generations"]
+
+
+def test_service_principal_info_secret_fetched_on_first_access():
+    """Test that the secret-backed fields are only fetched once, when first accessed."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    _, state_in = published_state()
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.run()
+        calls = record_secret_gets(manager)
+        client = manager.charm.azure_service_principal_client
+        info = client.get_azure_service_principal_info(lazy=True)
+        calls_before_access = len(calls)
+        client_id = info["client-id"]
+        calls_after_first_access = len(calls)
+        client_secret = info["client-secret"]
+
+    # Assert
+    assert calls_before_access == 0
+    assert "client-secret" in info
+    assert (client_id, client_secret) == ("clientid", "clientsecret")
+    assert info["subscription-id"] == "subscriptionid"
+    assert calls_after_first_access > 0
+    assert len(calls) == calls_after_first_access
+    assert "clientsecret" not in repr(info)
+
+
+def test_service_principal_info_returned_as_a_dict_by_default():
+    """Test that the info is a plain dictionary, holding the secret-backed fields too."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    _, state_in = published_state()
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.run()
+        info = manager.charm.azure_service_principal_client.get_azure_service_principal_info()
+
+    # Assert
+    assert type(info) is dict
+    assert info["subscription-id"] == "subscriptionid"
+    assert info["tenant-id"] == "tenantid"
+    assert (info["client-id"], info["client-secret"]) == ("clientid", "clientsecret")
+
+
+def test_service_principal_info_left_out_of_an_incomplete_secret():
+    """Test that the keys a secret lacks are neither listed nor announced."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    secret = Secret(tracked_content={"client-id": "clientid"})
+    relation = Relation(
+        endpoint=RELATION_NAME,
+        remote_app_data={
+            "subscription-id": "subscriptionid",
+            "tenant-id": "tenantid",
+            "secret-extra": secret.id,
+        },
+    )
+    state_in = State(relations=[relation], secrets={secret})
+
+    # Act
+    with ctx(ctx.on.relation_changed(relation), state_in) as manager:
+        client = manager.charm.azure_service_principal_client
+        info = client.get_azure_service_principal_info()
+        lazy_info = client.get_azure_service_principal_info(lazy=True)
+        manager.run()
+    emitted = [type(event).__name__ for event in ctx.emitted_events]
+
+    # Assert
+    assert info["client-id"] == "clientid"
+    assert "client-secret" not in info
+    assert "client-secret" not in lazy_info
+    assert len(lazy_info) == len(info)
+    assert "ServicePrincipalInfoChangedEvent" not in emitted
+
+
+def test_secret_field_layout_computed_once_per_model():
+    """Test that requirers of the same model share the layout of its secret fields."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    _, state_in = published_state()
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        first = manager.charm.azure_service_principal_client
+        second = AzureServicePrincipalRequirer(manager.charm, RELATION_NAME, "second")
+        manager.run()
+
+    # Assert
+    assert first._secret_field_specs is second._secret_field_specs
+    assert [spec.secret_field for spec in first._secret_field_specs] == ["secret-extra"] * 2
+
+
+def test_secret_cache_remembers_missing_secrets():
+    """Test that a secret not found is only looked up once in the dispatch."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    _, state_in = published_state()
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.run()
+        cache = manager.charm.azure_service_principal_client._secrets
+        calls = record_secret_gets(manager)
+        lookups = [cache.get("missing.secret") for _ in range(3)]
+        calls_after_misses = len(calls)
+        added = cache.add("missing.secret", {"key": "value"})
+        found = cache.get("missing.secret")
+
+    # Assert
+    assert lookups == [None] * 3
+    assert calls_after_misses == 1
+    assert found is added
+    assert manager.charm.azure_service_principal_client.secret_cache_stats() == {
+        "hits": 3,
+        "misses": 1,
+    }
+
+
+def test_service_principal_info_read_from_the_secret_switched_to():
+    """Test that the info is read from the new secret when the provider switches secrets."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation, state_in = published_state()
+    default_secret = next(iter(state_in.secrets))
+    prod_secret = Secret(
+        tracked_content={"client-id": "prodclientid", "client-secret": "prodclientsecret"}
+    )
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.charm.azure_service_principal_client.get_azure_service_principal_info()
+        state_in = manager.run()
+    switched = dataclasses.replace(
+        state_in.get_relation(relation.id),
+        remote_app_data={
+            "subscription-id": "subscriptionid",
+            "tenant-id": "tenantid",
+            "secret-extra": prod_secret.id,
+        },
+    )
+    state_in = dataclasses.replace(
+        state_in,
+        relations=[switched],
+        secrets={state_in.get_secret(id=default_secret.id), prod_secret},
+    )
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.run()
+        info = manager.charm.azure_service_principal_client.get_azure_service_principal_info()
+
+    # Assert
+    assert state_in.get_secret(id=default_secret.id).label
+    assert (info["client-id"], info["client-secret"]) == ("prodclientid", "prodclientsecret")
+
+
+def test_service_principal_info_fields_only_reads_no_secret():
+    """Test that the databag fields are returned without reading any secret."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    _, state_in = published_state()
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.run()
+        calls = record_secret_gets(manager)
+        client = manager.charm.azure_service_principal_client
+        info = client.get_azure_service_principal_info(fields_only=True)
+
+    # Assert
+    assert calls == []
+    assert info["tenant-id"] == "tenantid"
+    assert "client-secret" not in info
+
+
+def test_service_principal_info_changed_only_on_actual_change():
+    """Test that an unchanged relation-changed does not announce the info again."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation, state_in = published_state()
+    state_announced = ctx.run(ctx.on.relation_changed(relation), state_in)
+    announced = [type(event).__name__ for event in ctx.emitted_events]
+    ctx.emitted_events.clear()
+
+    # Act
+    ctx.run(ctx.on.relation_changed(relation), state_announced)
+
+    # Assert
+    assert "ServicePrincipalInfoChangedEvent" in announced
+    assert "ServicePrincipalInfoChangedEvent" not in [
+        type(event).__name__ for event in ctx.emitted_events
+    ]
+
+
+def test_service_principal_info_changed_on_secret_rotation():
+    """Test that a rotated secret announces the info again."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation, state_in = published_state()
+    state_announced = ctx.run(ctx.on.relation_changed(relation), state_in)
+    secret = next(iter(state_announced.secrets))
+    rotated = dataclasses.replace(
+        secret, latest_content={"client-id": "clientid", "client-secret": "rotated"}
+    )
+    state_in = dataclasses.replace(state_announced, secrets={rotated})
+    ctx.emitted_events.clear()
+
+    # Act
+    with ctx(ctx.on.secret_changed(rotated), state_in) as manager:
+        manager.run()
+        info = manager.charm.azure_service_principal_client.get_azure_service_principal_info()
+        client_secret = info["client-secret"]
+
+    # Assert
+    assert "ServicePrincipalInfoChangedEvent" in [
+        type(event).__name__ for event in ctx.emitted_events
+    ]
+    assert client_secret == "rotated"
+
+
+def test_secret_generations_pruned():
+    """Test that the secret generations are forgotten with their secret or relation."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation, state_in = published_state()
+    state_out = ctx.run(ctx.on.relation_changed(relation), state_in)
+    secret = next(iter(state_out.secrets))
+    state_out = ctx.run(ctx.on.secret_changed(secret), state_out)
+    generations_rotated = secret_generations(state_out)
+    replacement = Secret(tracked_content={"client-id": "clientid", "client-secret": "new"})
+    relation = dataclasses.replace(
+        state_out.get_relation(relation.id),
+        remote_app_data={**relation.remote_app_data, "secret-extra": replacement.id},
+    )
+    state_in = dataclasses.replace(state_out, relations=[relation], secrets={secret, replacement})
+
+    # Act
+    state_replaced = ctx.run(ctx.on.relation_changed(relation), state_in)
+    state_broken = ctx.run(ctx.on.relation_broken(relation), state_replaced)
+
+    # Assert
+    assert generations_rotated == {str(relation.id): {secret.id: 1}}
+    assert secret_generations(state_replaced) == {str(relation.id): {}}
+    assert secret_generations(state_broken) == {}
+
+
+def test_last_seen_response_written_by_leader_only_when_changed():
+    """Test that the leader records the response once and a repeat writes nothing."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation, state_in = published_state()
+    state_in = dataclasses.replace(state_in, leader=True)
+    state_recorded = ctx.run(ctx.on.relation_changed(relation), state_in)
+    relation = state_recorded.get_relation(relation.id)
+
+    # Act
+    with ctx(ctx.on.relation_changed(relation), state_recorded) as manager:
+        backend = manager.charm.model._backend
+        relation_set = backend.update_relation_data
+        writes = []
+
+        def _update_relation_data(*args, **kwargs):
+            writes.append(args)
+            return relation_set(*args, **kwargs)
+
+        backend.update_relation_data = _update_relation_data
+        manager.run()
+
+    # Assert
+    local = relation.local_app_data
+    assert local["tenant-id"] == "tenantid"
+    assert local["secret-extra"] == relation.remote_app_data["secret-extra"]
+    assert writes == []
+
+
+def test_last_seen_response_not_written_by_non_leader():
+    """Test that a non-leader unit does not record the response."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation, state_in = published_state()
+
+    # Act
+    state_out = ctx.run(ctx.on.relation_changed(relation), state_in)
+
+    # Assert
+    assert state_out.get_relation(relation.id).local_app_data == {}
+
+
+def test_all_service_principal_info_by_relation_and_remote_app():
+    """Test that the info of every relation is returned, optionally filtered by remote app."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation_prod, state_in = published_state()
+    relation_prod = dataclasses.replace(relation_prod, remote_app_name="integrator-prod")
+    secret = Secret(tracked_content={"client-id": "devid", "client-secret": "devsecret"})
+    relation_dev = Relation(
+        endpoint=RELATION_NAME,
+        remote_app_name="integrator-dev",
+        remote_app_data={
+            "subscription-id": "devsubscription",
+            "tenant-id": "devtenant",
+            "secret-extra": secret.id,
+        },
+    )
+    state_in = dataclasses.replace(
+        state_in, relations=[relation_prod, relation_dev], secrets={*state_in.secrets, secret}
+    )
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.run()
+        client = manager.charm.azure_service_principal_client
+        infos = client.get_all_service_principal_info()
+        dev_infos = client.get_all_service_principal_info(
+            remote_app="integrator-dev", fields_only=True
+        )
+
+    # Assert
+    assert infos[relation_prod.id]["client-secret"] == "clientsecret"
+    assert infos[relation_dev.id]["client-secret"] == "devsecret"
+    assert infos[relation_dev.id]["subscription-id"] == "devsubscription"
+    assert list(dev_infos) == [relation_dev.id]
+    assert "client-secret" not in dev_infos[relation_dev.id]
+
+
+def test_access_tokens_requested_and_read():
+    """Test that the leader asks for scopes, and reads the tokens published for them."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    scope = "https://storage.azure.com/.default"
+    token = Secret(tracked_content={"access-token": "token", "expires-on": "0"})
+    relation, state_in = published_state()
+    relation = dataclasses.replace(
+        relation,
+        remote_app_data={
+            **relation.remote_app_data,
+            "access-tokens": json.dumps({scope: token.id}),
+        },
+    )
+    state_in = dataclasses.replace(
+        state_in, leader=True, relations=[relation], secrets={*state_in.secrets, token}
+    )
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        client = manager.charm.azure_service_principal_client
+        client.request_access_tokens([scope, scope])
+        access_token = client.get_access_token(scope)
+        missing_token = client.get_access_token("https://vault.azure.net/.default")
+        info = client.get_azure_service_principal_info(fields_only=True)
+        state_out = manager.run()
+    renewed = dataclasses.replace(token, latest_content={"access-token": "renewed"})
+    ctx.run(ctx.on.secret_changed(renewed), dataclasses.replace(state_out, secrets={renewed}))
+
+    # Assert
+    local = state_out.get_relation(relation.id).local_app_data
+    assert json.loads(local["requested-scopes"]) == [scope]
+    assert access_token == "token"
+    assert missing_token is None
+    assert "access-tokens" not in info
+    assert "AccessTokenChangedEvent" in [type(event).__name__ for event in ctx.emitted_events]
+
+
+def test_service_principal_selected_by_leader():
+    """Test that the leader writes the name of the service principal it selects."""
+    # Arrange
+    ctx = Context(RequirerCharm, meta=METADATA)
+    relation, state_in = published_state()
+    state_in = dataclasses.replace(state_in, leader=True)
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        manager.charm.azure_service_principal_client.request_service_principal("prod")
+        state_out = manager.run()
+
+    # Assert
+    assert state_out.get_relation(relation.id).local_app_data["service-principal"] == "prod"
@@ -6,14 +6,24 @@
 import dataclasses
 import json
 import logging
+import time
+from collections import Counter
 from pathlib import Path
 
 import pytest
 import yaml
-from ops.model import ActiveStatus, BlockedStatus
+from ops.model import ActiveStatus, BlockedStatus, ModelError, WaitingStatus
 from ops.testing import Context, Relation, Secret, State
 from src.charm import AzureAuthIntegratorCharm
 
+from constants import (
+    ACCESS_TOKEN_EXPIRY_SKEW,
+    ACCESS_TOKEN_REFRESH_BATCH,
+    ACCESS_TOKEN_REFRESH_JITTER,
+)
+from core.domain import AzureServicePrincipalInfo
+from events.lifecycle import LifecycleEvents
+
 CONFIG = yaml.safe_load(Path("./config.yaml").read_text())
 METADATA = yaml.safe_load(Path("./metadata.yaml").read_text())
 
@@ -21,6 +31,23 @@ METADATA = yaml.safe_load(Path("./metadata.yaml").read_text())
 logger = logging.getLogger(__name__)
 
 
+def record_hook_tool_calls(manager, *methods: str) -> list[str]:
+    """Record the name of every call made to the given model backend methods."""
+    backend = manager.charm.model._backend
+    calls = []
+
+    def _recording(name, method):
+        def _call(*args, **kwargs):
+            calls.append(name)
+            return method(*args, **kwargs)
+
+        return _call
+
+    for name in methods:
+        setattr(backend, name, _recording(name, getattr(backend, name)))
+    return calls
+
+
 @pytest.fixture()
 def ctx() -> Context:
     ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=CONFIG, unit_id=0)
@@ -151,3 +178,1386 @@ def test_relation_application_data(
     secret = state_out.get_secret(id=provider_data["secret-extra"]).latest_content
     assert secret["client-id"] == "clientid"
     assert secret["client-secret"] == "clientsecret"
+
+
+def test_credentials_secret_fetched_once_per_hook(
+    ctx: Context[AzureAuthIntegratorCharm], base_state: State, charm_configuration: dict
+):
+    """Test that the credentials secret is read once, however many components need it."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    azure_service_principal_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+    )
+    state_in = dataclasses.replace(
+        base_state, relations=[azure_service_principal_relation], secrets={credentials_secret}
+    )
+
+    # Act
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        backend = manager.charm.model._backend
+        secret_get = backend.secret_get
+        fetched_ids = []
+
+        def _secret_get(*args, **kwargs):
+            fetched_ids.append(kwargs.get("id"))
+            return secret_get(*args, **kwargs)
+
+        backend.secret_get = _secret_get
+        state_out = manager.run()
+
+    # Assert
+    assert state_out.unit_status == ActiveStatus()
+    # One lookup for the secret itself, one for its latest revision.
+    assert fetched_ids.count(credentials_secret.id) == 2
+
+
+def test_secret_access_not_granted_waits_and_recovers(
+    ctx: Context[AzureAuthIntegratorCharm], base_state: State, charm_configuration: dict
+):
+    """Test that missing secret permission sets a waiting status and is re-checked later."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    azure_service_principal_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+    )
+    state_in = dataclasses.replace(
+        base_state, relations=[azure_service_principal_relation], secrets={credentials_secret}
+    )
+
+    # Act
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+
+        def _secret_get(*args, **kwargs):
+            raise ModelError("ERROR permission denied")
+
+        manager.charm.model._backend.secret_get = _secret_get
+        state_waiting = manager.run()
+    state_out = ctx.run(ctx.on.update_status(), state_waiting)
+
+    # Assert
+    assert isinstance(status := state_waiting.unit_status, WaitingStatus)
+    assert "has not been granted" in status.message
+    assert state_out.unit_status == ActiveStatus()
+    provider_data = state_out.get_relation(azure_service_principal_relation.id).local_app_data
+    assert provider_data["subscription-id"] == "subscriptionid"
+    assert "secret-extra" in provider_data
+
+
+def test_update_status_skips_unchanged_provider_data(
+    ctx: Context[AzureAuthIntegratorCharm], base_state: State, charm_configuration: dict
+):
+    """Test that update-status does not rewrite provider data that is already published."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    azure_service_principal_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+    )
+    state_in = dataclasses.replace(
+        base_state, relations=[azure_service_principal_relation], secrets={credentials_secret}
+    )
+    state_published = ctx.run(ctx.on.config_changed(), state_in)
+
+    # Act
+    with ctx(ctx.on.update_status(), state_published) as manager:
+        calls = record_hook_tool_calls(
+            manager, "relation_get", "relation_set", "secret_get", "secret_set"
+        )
+        state_out = manager.run()
+
+    # Assert
+    assert state_out.unit_status == ActiveStatus()
+    assert "relation_set" not in calls
+    assert "secret_set" not in calls
+    assert "relation_get" not in calls
+
+
+def test_joining_consumer_only_publishes_to_the_new_relation(
+    base_state: State, charm_configuration: dict
+):
+    """Test that a new consumer joining does not rewrite the other consumers' data."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(3)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+    state_published = ctx.run(ctx.on.config_changed(), state_in)
+    new_relation = Relation(endpoint="azure-service-principal-credentials")
+    state_in = dataclasses.replace(
+        state_published, relations=[*state_published.relations, new_relation]
+    )
+
+    # Act
+    with ctx(ctx.on.relation_joined(new_relation), state_in) as manager:
+        calls = record_hook_tool_calls(manager, "relation_get", "relation_set", "secret_grant")
+        state_out = manager.run()
+
+    # Assert
+    assert calls == ["relation_get", "relation_get", "secret_grant", "relation_set"]
+    assert state_out.get_relation(new_relation.id).local_app_data["secret-extra"]
+
+
+def test_broken_relation_is_forgotten(base_state: State, charm_configuration: dict):
+    """Test that a consumer leaving does not cause the remaining ones to be republished."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(3)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+    state_published = ctx.run(ctx.on.config_changed(), state_in)
+    broken = state_published.get_relation(relations[0].id)
+
+    # Act
+    state_broken = ctx.run(ctx.on.relation_broken(broken), state_published)
+    remaining = dataclasses.replace(
+        state_broken, relations=[r for r in state_broken.relations if r.id != broken.id]
+    )
+    with ctx(ctx.on.config_changed(), remaining) as manager:
+        calls = record_hook_tool_calls(manager, "relation_get", "relation_set")
+        manager.run()
+
+    # Assert
+    published = state_broken.get_stored_state(
+        "_state", owner_path="AzureAuthIntegratorCharm/LifecycleEvents[lifecycle]"
+    )
+    assert str(broken.id) not in published.content["published_relations"]
+    assert calls == []
+
+
+def test_leader_elected_republishes_the_provider_data(
+    base_state: State, charm_configuration: dict
+):
+    """Test that a unit elected leader again republishes what another leader overwrote."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relation = Relation(endpoint="azure-service-principal-credentials")
+    state_in = dataclasses.replace(base_state, relations=[relation], secrets={credentials_secret})
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+    # Another leader published other credentials in the meantime.
+    published = state_in.get_relation(relation.id)
+    overwritten = dataclasses.replace(
+        published,
+        local_app_data={**published.local_app_data, "subscription-id": "othersubscriptionid"},
+    )
+    state_in = dataclasses.replace(state_in, relations=[overwritten])
+
+    # Act
+    state_out = ctx.run(ctx.on.leader_elected(), state_in)
+
+    # Assert
+    local_app_data = state_out.get_relation(relation.id).local_app_data
+    assert local_app_data["subscription-id"] == "subscriptionid"
+
+
+def test_leader_elected_rewrites_the_shared_secret(base_state: State, charm_configuration: dict):
+    """Test that a unit elected leader again rewrites a shared secret another leader updated."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relation = Relation(endpoint="azure-service-principal-credentials")
+    state_in = dataclasses.replace(base_state, relations=[relation], secrets={credentials_secret})
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+    # Another leader published other credentials in the meantime.
+    shared_secret_id = state_in.get_relation(relation.id).local_app_data["secret-extra"]
+    other_content = {"client-id": "otherclientid", "client-secret": "otherclientsecret"}
+    overwritten = dataclasses.replace(
+        state_in.get_secret(id=shared_secret_id),
+        tracked_content=other_content,
+        latest_content=other_content,
+    )
+    state_in = dataclasses.replace(
+        state_in,
+        secrets=[secret for secret in state_in.secrets if secret.id != shared_secret_id]
+        + [overwritten],
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.leader_elected(), state_in)
+
+    # Assert
+    assert state_out.get_secret(id=shared_secret_id).latest_content == {
+        "client-id": "clientid",
+        "client-secret": "clientsecret",
+    }
+
+
+HOOK_TOOL_METHODS = (
+    "is_leader",
+    "config_get",
+    "relation_ids",
+    "relation_list",
+    "relation_remote_app_name",
+    "relation_get",
+    "relation_set",
+    "secret_get",
+    "secret_add",
+    "secret_set",
+    "secret_grant",
+    "secret_info_get",
+    "status_set",
+)
+
+
+@pytest.mark.parametrize("leader", [True, False])
+def test_update_status_hook_tool_calls_per_unit(
+    base_state: State, charm_configuration: dict, leader: bool
+):
+    """Benchmark the hook-tool calls made by update-status on leader and non-leader units.
+
+    Before the leader guard, a non-leader unit rebuilt the provider model for every relation and
+    failed on the application databag writes (an uncaught SecretError from `serialize_model`),
+    and the leader made ~4 secret-get and 1 relation-get per relation even with nothing to update.
+    """
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(10)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+    if leader:
+        state_in = ctx.run(ctx.on.config_changed(), state_in)
+    state_in = dataclasses.replace(state_in, leader=leader)
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        recorded = record_hook_tool_calls(manager, *HOOK_TOOL_METHODS)
+        state_out = manager.run()
+    calls = Counter(recorded)
+    logger.info(f"update-status hook-tool calls (leader={leader}): {dict(calls)}")
+
+    # Assert
+    assert state_out.unit_status == ActiveStatus()
+    # Reading the credentials secret for the unit status: lookup and latest revision.
+    assert calls["secret_get"] == 2
+    for method in ("relation_get", "relation_set", "secret_add", "secret_set", "secret_grant"):
+        assert calls[method] == 0
+    if not leader:
+        assert calls["relation_ids"] == calls["relation_list"] == 0
+
+
+def test_provider_data_written_in_one_relation_set_per_relation(
+    base_state: State, charm_configuration: dict
+):
+    """Test that publishing the provider data commits each relation's databag at once."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(3)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+
+    # Act
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        calls = record_hook_tool_calls(manager, "relation_set")
+        state_out = manager.run()
+
+    # Assert
+    assert calls.count("relation_set") == len(relations)
+    for relation in relations:
+        provider_data = state_out.get_relation(relation.id).local_app_data
+        assert provider_data["subscription-id"] == "subscriptionid"
+        assert provider_data["tenant-id"] == "tenantid"
+        assert provider_data["secret-extra"]
+
+
+def test_provider_credentials_shared_in_one_secret(base_state: State, charm_configuration: dict):
+    """Test that a single secret holding all the credentials is granted to every relation."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(3)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+
+    # Act
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        calls = record_hook_tool_calls(manager, "secret_add", "secret_grant", "secret_set")
+        state_out = manager.run()
+
+    # Assert
+    assert calls.count("secret_add") == 1
+    assert calls.count("secret_grant") == len(relations)
+    assert "secret_set" not in calls
+    secret_ids = {
+        state_out.get_relation(relation.id).local_app_data["secret-extra"]
+        for relation in relations
+    }
+    assert len(secret_ids) == 1
+    assert state_out.get_secret(id=secret_ids.pop()).tracked_content == {
+        "client-id": "clientid",
+        "client-secret": "clientsecret",
+    }
+
+
+def test_credentials_rotation_updates_the_shared_secret_once(
+    base_state: State, charm_configuration: dict
+):
+    """Test that rotating the credentials costs one secret update, whatever the relations."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(3)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+    rotated = dataclasses.replace(
+        credentials_secret,
+        latest_content={"client-id": "clientid", "client-secret": "rotated"},
+    )
+    state_in = dataclasses.replace(
+        state_in,
+        secrets={secret for secret in state_in.secrets if secret.id != rotated.id} | {rotated},
+    )
+
+    # Act
+    with ctx(ctx.on.secret_changed(rotated), state_in) as manager:
+        calls = record_hook_tool_calls(
+            manager, "relation_set", "secret_add", "secret_grant", "secret_set"
+        )
+        state_out = manager.run()
+
+    # Assert
+    assert calls == ["secret_set"]
+    secret_id = state_out.get_relation(relations[0].id).local_app_data["secret-extra"]
+    assert state_out.get_secret(id=secret_id).latest_content == {
+        "client-id": "clientid",
+        "client-secret": "rotated",
+    }
+
+
+def test_per_relation_secrets_moved_to_the_shared_secret(
+    base_state: State, charm_configuration: dict
+):
+    """Test that a relation published to with its own secret is moved to the shared one."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relation = Relation(endpoint="azure-service-principal-credentials")
+    relation_secret = Secret(
+        tracked_content={"client-id": "clientid", "client-secret": "clientsecret"},
+        owner="app",
+        label=f"azure-service-principal-credentials.{relation.id}.extra.secret",
+    )
+    relation = dataclasses.replace(
+        relation,
+        local_app_data={
+            "subscription-id": "subscriptionid",
+            "tenant-id": "tenantid",
+            "secret-extra": relation_secret.id,
+        },
+    )
+    state_in = dataclasses.replace(
+        base_state, relations=[relation], secrets={credentials_secret, relation_secret}
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.config_changed(), state_in)
+
+    # Assert
+    secret_id = state_out.get_relation(relation.id).local_app_data["secret-extra"]
+    assert secret_id != relation_secret.id
+    assert state_out.get_secret(id=secret_id).tracked_content == {
+        "client-id": "clientid",
+        "client-secret": "clientsecret",
+    }
+    assert relation_secret.id not in {secret.id for secret in state_out.secrets}
+
+
+@pytest.mark.parametrize(
+    "forgotten,secret_gets",
+    [
+        # The credentials secret; the published secret is known to hold the same content.
+        ("LifecycleEvents", 2),
+        # The credentials secret, then the shared secret, looked up once to compare its content.
+        ("", 2 + 2),
+    ],
+)
+def test_republishing_identical_provider_data_writes_nothing(
+    base_state: State, charm_configuration: dict, forgotten: str, secret_gets: int
+):
+    """Test that republishing unchanged credentials does not touch databags or secrets."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(3)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+    # Forget what was published so that the provider data is republished.
+    state_in = dataclasses.replace(
+        state_in,
+        stored_states=[
+            stored
+            for stored in state_in.stored_states
+            if forgotten not in (stored.owner_path or "")
+        ],
+    )
+
+    # Act
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        calls = record_hook_tool_calls(
+            manager, "relation_set", "secret_get", "secret_add", "secret_set"
+        )
+        state_out = manager.run()
+
+    # Assert
+    assert state_out.unit_status == ActiveStatus()
+    assert "relation_set" not in calls
+    assert "secret_add" not in calls
+    assert "secret_set" not in calls
+    assert calls.count("secret_get") == secret_gets
+
+
+def test_provider_looks_each_secret_up_once_per_dispatch(
+    base_state: State, charm_configuration: dict
+):
+    """Test that the provider only looks its secrets up the first time it publishes them."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(3)]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+
+    # Act
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        provider = manager.charm.lifecycle_events.azure_service_principal_provider
+        calls = record_hook_tool_calls(manager, "secret_get", "secret_set")
+        for client_secret in ("rotated", "rotated-again"):
+            provider.update_responses(
+                {
+                    "subscription-id": "subscriptionid",
+                    "tenant-id": "tenantid",
+                    "client-id": "clientid",
+                    "client-secret": client_secret,
+                }
+            )
+        published_calls = list(calls)
+        cache_stats = provider.secret_cache_stats()
+        manager.run()
+
+    # Assert
+    assert published_calls == ["secret_get", "secret_set", "secret_set"]
+    assert cache_stats == {"hits": 1, "misses": 1}
+
+
+def test_hook_tool_instrumentation(base_state: State, charm_configuration: dict, tmp_path: Path):
+    """Test that enabling the instrumentation reports the hook-tool calls of each hook."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["instrument-hook-tools"]["default"] = True
+    ctx = Context(
+        AzureAuthIntegratorCharm,
+        meta=METADATA,
+        config=charm_configuration,
+        unit_id=0,
+        charm_root=tmp_path,
+    )
+    azure_service_principal_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+    )
+    state_in = dataclasses.replace(
+        base_state, relations=[azure_service_principal_relation], secrets={credentials_secret}
+    )
+
+    # Act
+    ctx.run(ctx.on.config_changed(), state_in)
+
+    # Assert
+    metrics = json.loads((tmp_path / "hook-tool-metrics.json").read_text())
+    summary = metrics["config-changed"]
+    assert summary["tools"]["relation-set"]["calls"] == 1
+    assert summary["tools"]["secret-add"]["calls"] == 1
+    assert summary["calls"] == sum(tool["calls"] for tool in summary["tools"].values())
+
+
+def test_credentials_validated_once_until_they_expire(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that valid credentials are checked against the token endpoint, then remembered."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["validate-credentials"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    state_in = dataclasses.replace(base_state, secrets={credentials_secret})
+
+    # Act
+    state_validated = ctx.run(ctx.on.config_changed(), state_in)
+    state_out = ctx.run(ctx.on.update_status(), state_validated)
+
+    # Assert
+    assert state_validated.unit_status == ActiveStatus()
+    assert state_out.unit_status == ActiveStatus()
+    assert len(token_server.requests) == 1
+    request = token_server.requests[0]
+    assert request["path"] == "/tenantid/oauth2/v2.0/token"
+    assert request["client_id"] == "clientid"
+
+
+def test_credentials_validated_by_the_leader_only(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that units other than the leader do not query the token endpoint."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["validate-credentials"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=1)
+    state_in = dataclasses.replace(base_state, leader=False, secrets={credentials_secret})
+
+    # Act
+    state_out = ctx.run(ctx.on.update_status(), state_in)
+
+    # Assert
+    assert state_out.unit_status == ActiveStatus()
+    assert token_server.requests == []
+
+
+@pytest.mark.parametrize(
+    "server_status,expected_status,message",
+    [
+        (None, BlockedStatus, "AADSTS7000215"),
+        (503, WaitingStatus, "HTTP 503"),
+    ],
+)
+def test_credentials_validation_failure(
+    base_state: State,
+    charm_configuration: dict,
+    token_server,
+    server_status,
+    expected_status,
+    message,
+):
+    """Test that rejected credentials block the charm, and an unavailable endpoint waits."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "wrongsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    token_server.status = server_status
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["validate-credentials"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    state_in = dataclasses.replace(base_state, secrets={credentials_secret})
+
+    # Act
+    state_out = ctx.run(ctx.on.config_changed(), state_in)
+
+    # Assert
+    assert isinstance(status := state_out.unit_status, expected_status)
+    assert message in status.message
+    assert len(token_server.requests) == 1
+
+
+def test_access_tokens_minted_once_per_scope(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that the scopes asked by the consumers get one shared token each."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["mint-access-tokens"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    storage_scope = "https://storage.azure.com/.default"
+    vault_scope = "https://vault.azure.net/.default"
+    relations = [
+        Relation(
+            endpoint="azure-service-principal-credentials",
+            remote_app_data={"requested-scopes": json.dumps(scopes)},
+        )
+        for scopes in ([storage_scope], [storage_scope, vault_scope])
+    ]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+
+    # Act
+    state_minted = ctx.run(ctx.on.relation_changed(relations[1]), state_in)
+    state_out = ctx.run(
+        ctx.on.relation_changed(state_minted.get_relation(relations[0].id)), state_minted
+    )
+
+    # Assert
+    assert sorted(request["scope"] for request in token_server.requests) == sorted(
+        [storage_scope, vault_scope]
+    )
+    tokens = [
+        json.loads(state_out.get_relation(relation.id).local_app_data["access-tokens"])
+        for relation in relations
+    ]
+    assert list(tokens[0]) == [storage_scope]
+    assert sorted(tokens[1]) == [storage_scope, vault_scope]
+    assert tokens[0][storage_scope] == tokens[1][storage_scope]
+    secret = state_out.get_secret(id=tokens[1][vault_scope])
+    assert secret.tracked_content["access-token"].startswith("token-")
+    assert secret.expire is not None
+
+
+def test_access_tokens_renewed_before_expiry_and_removed_when_disabled(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that expiring tokens are renewed in place, and removed once minting is disabled."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    # Tokens expiring right away are renewed on the next hook.
+    token_server.expires_in = 0
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["mint-access-tokens"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    scope = "https://storage.azure.com/.default"
+    relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"requested-scopes": json.dumps([scope])},
+    )
+    state_in = dataclasses.replace(base_state, relations=[relation], secrets={credentials_secret})
+    state_minted = ctx.run(ctx.on.relation_changed(relation), state_in)
+    uri = json.loads(state_minted.get_relation(relation.id).local_app_data["access-tokens"])[scope]
+
+    # Act
+    state_renewed = ctx.run(ctx.on.update_status(), state_minted)
+    state_disabled = ctx.run(
+        ctx.on.config_changed(),
+        dataclasses.replace(state_renewed, config={"mint-access-tokens": False}),
+    )
+
+    # Assert
+    assert len(token_server.requests) == 2
+    assert state_renewed.get_secret(id=uri).latest_content["access-token"] == "token-2"
+    assert "access-tokens" not in state_disabled.get_relation(relation.id).local_app_data
+    assert all(secret.id != uri for secret in state_disabled.secrets)
+
+
+def test_access_tokens_withdrawn_from_the_relation(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that a scope a consumer no longer asks for has its token revoked from it."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["mint-access-tokens"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    storage_scope = "https://storage.azure.com/.default"
+    vault_scope = "https://vault.azure.net/.default"
+    relations = [
+        Relation(
+            endpoint="azure-service-principal-credentials",
+            remote_app_data={"requested-scopes": json.dumps([storage_scope, vault_scope])},
+        )
+        for _ in range(2)
+    ]
+    state_in = dataclasses.replace(base_state, relations=relations, secrets={credentials_secret})
+    state_minted = ctx.run(ctx.on.config_changed(), state_in)
+    tokens = json.loads(state_minted.get_relation(relations[0].id).local_app_data["access-tokens"])
+    narrowed = dataclasses.replace(
+        state_minted.get_relation(relations[0].id),
+        remote_app_data={"requested-scopes": json.dumps([storage_scope])},
+    )
+    state_in = dataclasses.replace(
+        state_minted, relations=[narrowed, state_minted.get_relation(relations[1].id)]
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.relation_changed(narrowed), state_in)
+
+    # Assert
+    narrowed_tokens = json.loads(
+        state_out.get_relation(narrowed.id).local_app_data["access-tokens"]
+    )
+    assert list(narrowed_tokens) == [storage_scope]
+    vault_grants = state_out.get_secret(id=tokens[vault_scope]).remote_grants
+    assert not vault_grants.get(narrowed.id)
+    assert vault_grants.get(relations[1].id)
+
+
+def test_expired_access_token_withdrawn_when_renewal_fails(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that a token that could not be renewed is not shared once expired."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    # Tokens expiring right away are renewed on the next hook.
+    token_server.expires_in = 0
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["mint-access-tokens"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    scope = "https://storage.azure.com/.default"
+    relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"requested-scopes": json.dumps([scope])},
+    )
+    state_in = dataclasses.replace(base_state, relations=[relation], secrets={credentials_secret})
+    state_minted = ctx.run(ctx.on.relation_changed(relation), state_in)
+    token_server.status = 503
+
+    # Act
+    state_out = ctx.run(ctx.on.update_status(), state_minted)
+
+    # Assert
+    assert "access-tokens" in state_minted.get_relation(relation.id).local_app_data
+    assert len(token_server.requests) == 2
+    assert "access-tokens" not in state_out.get_relation(relation.id).local_app_data
+
+
+def test_access_token_without_lifetime_not_shared(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that a token the endpoint gives no lifetime for is not shared."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    token_server.expires_in = None
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["mint-access-tokens"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"requested-scopes": json.dumps(["https://storage.azure.com/.default"])},
+    )
+    state_in = dataclasses.replace(base_state, relations=[relation], secrets={credentials_secret})
+
+    # Act
+    state_out = ctx.run(ctx.on.relation_changed(relation), state_in)
+
+    # Assert
+    assert len(token_server.requests) == 1
+    assert "access-tokens" not in state_out.get_relation(relation.id).local_app_data
+
+
+def test_access_tokens_renewed_in_batches_earliest_first(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that due tokens are renewed a batch per hook, the longest due first."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    # Tokens expiring right away are renewed on the next hook.
+    token_server.expires_in = 0
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["mint-access-tokens"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    scopes = [f"https://account{i}.blob.core.windows.net/.default" for i in range(7)]
+    relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"requested-scopes": json.dumps(scopes)},
+    )
+    state_in = dataclasses.replace(base_state, relations=[relation], secrets={credentials_secret})
+    state_minted = ctx.run(ctx.on.relation_changed(relation), state_in)
+
+    # Act
+    state_first = ctx.run(ctx.on.update_status(), state_minted)
+    ctx.run(ctx.on.update_status(), state_first)
+
+    # Assert
+    renewed = [request["scope"] for request in token_server.requests[len(scopes) :]]
+    first, second = renewed[:ACCESS_TOKEN_REFRESH_BATCH], renewed[ACCESS_TOKEN_REFRESH_BATCH:]
+    assert len(first) == len(second) == ACCESS_TOKEN_REFRESH_BATCH
+    assert set(scopes) - set(first) <= set(second)
+
+
+def test_access_tokens_renewed_in_batches_on_new_credentials(
+    base_state: State, charm_configuration: dict, token_server
+):
+    """Test that new credentials renew the tokens minted with the old ones a batch per hook."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    token_server.clients["clientid"] = "clientsecret"
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["mint-access-tokens"]["default"] = True
+    charm_configuration["options"]["authority-url"]["default"] = token_server.url
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    scopes = [f"https://account{i}.blob.core.windows.net/.default" for i in range(7)]
+    relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"requested-scopes": json.dumps(scopes)},
+    )
+    state_in = dataclasses.replace(base_state, relations=[relation], secrets={credentials_secret})
+    state_minted = ctx.run(ctx.on.relation_changed(relation), state_in)
+    token_server.clients["clientid"] = "rotated"
+    rotated = dataclasses.replace(
+        credentials_secret,
+        latest_content={"client-id": "clientid", "client-secret": "rotated"},
+    )
+    state_in = dataclasses.replace(
+        state_minted,
+        secrets={secret for secret in state_minted.secrets if secret.id != rotated.id} | {rotated},
+    )
+
+    # Act
+    state_first = ctx.run(ctx.on.secret_changed(rotated), state_in)
+    renewed_first = len(token_server.requests) - len(scopes)
+    ctx.run(ctx.on.update_status(), state_first)
+
+    # Assert
+    renewed = [request["client_secret"] for request in token_server.requests[len(scopes) :]]
+    assert renewed_first == ACCESS_TOKEN_REFRESH_BATCH
+    assert renewed == ["rotated"] * len(scopes)
+
+
+def test_access_token_refresh_times_are_jittered():
+    """Test that tokens expiring together are renewed at different times ahead of expiry."""
+    # Arrange
+    expires = time.time() + 3600
+    scopes = [f"https://account{i}.blob.core.windows.net/.default" for i in range(10)]
+
+    # Act
+    refresh_times = [
+        LifecycleEvents._access_token_refresh_time(scope, expires) for scope in scopes
+    ]
+
+    # Assert
+    assert len(set(refresh_times)) == len(scopes)
+    latest = expires - ACCESS_TOKEN_EXPIRY_SKEW
+    earliest = latest - ACCESS_TOKEN_REFRESH_JITTER
+    assert all(earliest <= refresh <= latest for refresh in refresh_times)
+
+
+def test_relations_served_the_service_principal_they_select(
+    base_state: State, charm_configuration: dict
+):
+    """Test that each consumer gets the service principal it selects, the default otherwise."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    prod_secret = Secret(
+        tracked_content={
+            "client-id": "prodclientid",
+            "client-secret": "prodclientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["service-principals"]["default"] = json.dumps(
+        {"prod": {"subscription-id": "prodsubscriptionid", "credentials": prod_secret.id}}
+    )
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    default_relation = Relation(endpoint="azure-service-principal-credentials")
+    prod_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"service-principal": "prod"},
+    )
+    unknown_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"service-principal": "staging"},
+    )
+    state_in = dataclasses.replace(
+        base_state,
+        relations=[default_relation, prod_relation, unknown_relation],
+        secrets={credentials_secret, prod_secret},
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.config_changed(), state_in)
+
+    # Assert
+    assert state_out.unit_status == ActiveStatus()
+    default_data = state_out.get_relation(default_relation.id).local_app_data
+    prod_data = state_out.get_relation(prod_relation.id).local_app_data
+    assert default_data["subscription-id"] == "subscriptionid"
+    assert prod_data["subscription-id"] == "prodsubscriptionid"
+    assert prod_data["tenant-id"] == "tenantid"
+    assert default_data["secret-extra"] != prod_data["secret-extra"]
+    prod_published = state_out.get_secret(id=prod_data["secret-extra"])
+    assert prod_published.latest_content["client-secret"] == "prodclientsecret"
+    assert not state_out.get_relation(unknown_relation.id).local_app_data
+
+
+def test_named_service_principals_without_default_credentials(
+    base_state: State, charm_configuration: dict
+):
+    """Test that the default options alone are shared with the named service principals."""
+    # Arrange
+    prod_secret = Secret(
+        tracked_content={
+            "client-id": "prodclientid",
+            "client-secret": "prodclientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["service-principals"]["default"] = json.dumps(
+        {"prod": prod_secret.id}
+    )
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    prod_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"service-principal": "prod"},
+    )
+    state_in = dataclasses.replace(base_state, relations=[prod_relation], secrets={prod_secret})
+
+    # Act
+    state_out = ctx.run(ctx.on.config_changed(), state_in)
+
+    # Assert
+    assert state_out.unit_status == ActiveStatus()
+    prod_data = state_out.get_relation(prod_relation.id).local_app_data
+    assert prod_data["subscription-id"] == "subscriptionid"
+
+
+def test_named_service_principal_unpublished_without_service_principals(
+    base_state: State, charm_configuration: dict
+):
+    """Test that a consumer selecting a name is not served the default in its place."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    default_relation = Relation(endpoint="azure-service-principal-credentials")
+    prod_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"service-principal": "prod"},
+    )
+    state_in = dataclasses.replace(
+        base_state, relations=[default_relation, prod_relation], secrets={credentials_secret}
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.relation_joined(prod_relation), state_in)
+    state_out = ctx.run(ctx.on.config_changed(), state_out)
+
+    # Assert
+    assert state_out.get_relation(default_relation.id).local_app_data["secret-extra"]
+    assert not state_out.get_relation(prod_relation.id).local_app_data
+
+
+def test_switching_service_principal_keeps_the_shared_secret(
+    base_state: State, charm_configuration: dict
+):
+    """Test that a consumer leaving the default service principal leaves its secret alone."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    prod_secret = Secret(
+        tracked_content={
+            "client-id": "prodclientid",
+            "client-secret": "prodclientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["service-principals"]["default"] = json.dumps(
+        {"prod": prod_secret.id}
+    )
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    relations = [Relation(endpoint="azure-service-principal-credentials") for _ in range(2)]
+    state_in = dataclasses.replace(
+        base_state, relations=relations, secrets={credentials_secret, prod_secret}
+    )
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+    default_secret_id = state_in.get_relation(relations[0].id).local_app_data["secret-extra"]
+    switching = dataclasses.replace(
+        state_in.get_relation(relations[1].id), remote_app_data={"service-principal": "prod"}
+    )
+    state_in = dataclasses.replace(
+        state_in, relations=[state_in.get_relation(relations[0].id), switching]
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.relation_changed(switching), state_in)
+
+    # Assert
+    switched_data = state_out.get_relation(switching.id).local_app_data
+    assert switched_data["secret-extra"] != default_secret_id
+    assert state_out.get_relation(relations[0].id).local_app_data["secret-extra"] == (
+        default_secret_id
+    )
+    assert state_out.get_secret(id=default_secret_id).tracked_content == {
+        "client-id": "clientid",
+        "client-secret": "clientsecret",
+    }
+    default_grants = state_out.get_secret(id=default_secret_id).remote_grants
+    assert not default_grants.get(switching.id)
+    assert default_grants.get(relations[0].id)
+    assert state_out.get_secret(id=switched_data["secret-extra"]).remote_grants.get(switching.id)
+
+
+def test_leader_elected_reads_the_service_principal_selections_again(
+    base_state: State, charm_configuration: dict
+):
+    """Test that a unit elected leader again serves what the consumers select by then."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    prod_secret = Secret(
+        tracked_content={
+            "client-id": "prodclientid",
+            "client-secret": "prodclientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["service-principals"]["default"] = json.dumps(
+        {"prod": prod_secret.id}
+    )
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    default_relation = Relation(endpoint="azure-service-principal-credentials")
+    prod_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"service-principal": "prod"},
+    )
+    state_in = dataclasses.replace(
+        base_state,
+        relations=[default_relation, prod_relation],
+        secrets={credentials_secret, prod_secret},
+    )
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+    # The consumer went back to the default service principal under another leader.
+    switched_back = dataclasses.replace(
+        state_in.get_relation(prod_relation.id), remote_app_data={}
+    )
+    state_in = dataclasses.replace(
+        state_in, relations=[state_in.get_relation(default_relation.id), switched_back]
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.leader_elected(), state_in)
+
+    # Assert
+    default_secret_id = state_out.get_relation(default_relation.id).local_app_data["secret-extra"]
+    assert state_out.get_relation(prod_relation.id).local_app_data["secret-extra"] == (
+        default_secret_id
+    )
+
+
+def test_named_service_principal_credentials_rotation_republished(
+    base_state: State, charm_configuration: dict
+):
+    """Test that rotating the credentials of a named service principal republishes them."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    prod_secret = Secret(
+        tracked_content={
+            "client-id": "prodclientid",
+            "client-secret": "prodclientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["service-principals"]["default"] = json.dumps(
+        {"prod": prod_secret.id}
+    )
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    prod_relation = Relation(
+        endpoint="azure-service-principal-credentials",
+        remote_app_data={"service-principal": "prod"},
+    )
+    state_in = dataclasses.replace(
+        base_state, relations=[prod_relation], secrets={credentials_secret, prod_secret}
+    )
+    state_in = ctx.run(ctx.on.config_changed(), state_in)
+    rotated = dataclasses.replace(
+        prod_secret,
+        latest_content={"client-id": "prodclientid", "client-secret": "rotated"},
+    )
+    state_in = dataclasses.replace(
+        state_in,
+        secrets={secret for secret in state_in.secrets if secret.id != rotated.id} | {rotated},
+    )
+
+    # Act
+    state_out = ctx.run(ctx.on.secret_changed(rotated), state_in)
+
+    # Assert
+    secret_id = state_out.get_relation(prod_relation.id).local_app_data["secret-extra"]
+    assert state_out.get_secret(id=secret_id).latest_content == {
+        "client-id": "prodclientid",
+        "client-secret": "rotated",
+    }
+
+
+@pytest.mark.parametrize(
+    "service_principals,message",
+    [
+        ("prod: [", "Invalid service-principals"),
+        ('["prod"]', "Invalid service-principals"),
+        ('{"prod": {"region": "westeurope"}}', "unknown options"),
+        ('{"prod": "secret:missing"}', "prod: "),
+    ],
+)
+def test_invalid_service_principals_blocked(
+    base_state: State, charm_configuration: dict, service_principals: str, message: str
+):
+    """Test that an invalid service-principals option blocks the charm."""
+    # Arrange
+    credentials_secret = Secret(
+        tracked_content={
+            "client-id": "clientid",
+            "client-secret": "clientsecret",
+        }
+    )
+    charm_configuration["options"]["subscription-id"]["default"] = "subscriptionid"
+    charm_configuration["options"]["tenant-id"]["default"] = "tenantid"
+    charm_configuration["options"]["credentials"]["default"] = credentials_secret.id
+    charm_configuration["options"]["service-principals"]["default"] = service_principals
+    ctx = Context(AzureAuthIntegratorCharm, meta=METADATA, config=charm_configuration, unit_id=0)
+    state_in = dataclasses.replace(base_state, secrets={credentials_secret})
+
+    # Act
+    state_out = ctx.run(ctx.on.config_changed(), state_in)
+
+    # Assert
+    assert isinstance(status := state_out.unit_status, BlockedStatus)
+    assert message in status.message
+
+
+def test_service_principal_info_is_an_immutable_value():
+    """Test that the info is normalized, read-only, and compared by its digest."""
+    # Arrange
+    info = AzureServicePrincipalInfo(
+        subscription_id="subscriptionid", tenant_id=None, client_id="clientid"
+    )
+
+    # Act
+    same = AzureServicePrincipalInfo(
+        subscription_id="subscriptionid", tenant_id="", client_id="clientid"
+    )
+    other = AzureServicePrincipalInfo(
+        subscription_id="subscriptionid", client_id="clientid", name="prod"
+    )
+
+    # Assert
+    assert info.tenant_id == ""
+    assert (
+        info.to_dict()
+        == dict(info.data)
+        == {
+            "subscription-id": "subscriptionid",
+            "tenant-id": "",
+            "client-id": "clientid",
+            "client-secret": "",
+        }
+    )
+    assert info == same and hash(info) == hash(same)
+    assert info != other and info.digest != other.digest
+    assert "client_secret" not in repr(info)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        info.client_id = "changed"  # type: ignore[misc]
+    with pytest.raises(TypeError):
+        info.data["client-id"] = "changed"  # type: ignore[index]